@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class BitBoard:
+    """
+    Bitboard engine for the game board.
+    Each mask is a python int with one bit per cell, bit index = y * stride + x.
+    Every row is padded with one unused bit so horizontal shifts can't wrap onto the next row.
+    """
+    def __init__(self, board_size: tuple[int, int], player_colors: list[str]):
+        """
+        Create an empty bitboard
+        :param board_size: Size of the board (x,y)
+        :param player_colors: Colors of the players using the board
+        """
+        self.width, self.height = board_size
+        self.stride = self.width + 1
+        row_mask = (1 << self.width) - 1
+        self.board_mask = 0
+        for y in range(self.height):
+            self.board_mask |= row_mask << (y * self.stride)
+        self.occupied = 0
+        self.owned = {color: 0 for color in player_colors}
+        self.starts = {color: 0 for color in player_colors}
+        self.forbidden = {color: 0 for color in player_colors}
+        self.corners = {color: 0 for color in player_colors}
+        # Shape coords => (normalised mask, min x, min y, max x, max y)
+        self.shape_cache = {}
+
+    def index(self, x: int, y: int) -> int:
+        """
+        Bit index of a cell
+        :param x: x coord
+        :param y: y coord
+        :return: Bit index
+        """
+        return y * self.stride + x
+
+    def cell_mask(self, x: int, y: int) -> int:
+        """
+        Mask containing a single cell
+        :param x: x coord
+        :param y: y coord
+        :return: Mask
+        """
+        return 1 << (y * self.stride + x)
+
+    def adjacent(self, mask: int) -> int:
+        """
+        Cells orthogonally adjacent to any cell in mask
+        :param mask: Mask to expand
+        :return: Mask of adjacent cells, may include cells of mask itself
+        """
+        return ((mask << 1) | (mask >> 1) | (mask << self.stride) | (mask >> self.stride)) & self.board_mask
+
+    def diagonal(self, mask: int) -> int:
+        """
+        Cells diagonally adjacent to any cell in mask
+        :param mask: Mask to expand
+        :return: Mask of diagonal cells, may include cells of mask itself
+        """
+        stride = self.stride
+        return ((mask << (stride + 1)) | (mask << (stride - 1)) |
+                (mask >> (stride - 1)) | (mask >> (stride + 1))) & self.board_mask
+
+    def expand(self, mask: int, steps: int) -> int:
+        """
+        Cells within steps orthogonal moves of any cell in mask
+        :param mask: Mask to expand
+        :param steps: Number of steps
+        :return: Expanded mask, including mask itself
+        """
+        for i in range(steps):
+            mask |= self.adjacent(mask)
+        return mask
+
+    def shape_mask(self, coords: list, x: int, y: int) -> int | None:
+        """
+        Mask of a shape placed with its origin at (x, y)
+        :param coords: Relative coordinates of the shape
+        :param x: x coord
+        :param y: y coord
+        :return: Mask, None if any part of the shape is off the board
+        """
+        key = tuple((int(coord[0]), int(coord[1])) for coord in coords)
+        entry = self.shape_cache.get(key)
+        if entry is None:
+            minx = min(coord[0] for coord in key)
+            miny = min(coord[1] for coord in key)
+            maxx = max(coord[0] for coord in key)
+            maxy = max(coord[1] for coord in key)
+            mask = 0
+            for coord in key:
+                mask |= 1 << ((coord[1] - miny) * self.stride + coord[0] - minx)
+            entry = (mask, minx, miny, maxx, maxy)
+            self.shape_cache[key] = entry
+        mask, minx, miny, maxx, maxy = entry
+        x, y = int(x), int(y)
+        if x + minx < 0 or y + miny < 0 or x + maxx >= self.width or y + maxy >= self.height:
+            return None
+        return mask << ((y + miny) * self.stride + x + minx)
+
+    def fits(self, mask: int, color: str) -> bool:
+        """
+        Can color place the given mask
+        True if no cell is forbidden and at least one cell is a corner
+        :param mask: Mask of the placement
+        :param color: Player color
+        :return: bool
+        """
+        return not mask & self.forbidden[color] and bool(mask & self.corners[color])
+
+    def add_start(self, x: int, y: int, color: str):
+        """
+        Make a cell a starting position for color
+        :param x: x coord
+        :param y: y coord
+        :param color: Player color
+        """
+        self.starts[color] |= self.cell_mask(x, y)
+        self.update_masks([color])
+
+    def place(self, mask: int, color: str) -> int:
+        """
+        Fill the cells of mask with color, then update the forbidden and corner masks around it
+        Only cells within one step of mask can change, so the masks are patched rather than recomputed
+        :param mask: Mask of the placement
+        :param color: Player color
+        :return: Mask of cells whose corner status changed for any color
+        """
+        self.occupied |= mask
+        self.owned[color] |= mask
+        changed = 0
+        for other in self.corners:
+            old_corners = self.corners[other]
+            if other == color:
+                forbidden = self.forbidden[color] | mask | self.adjacent(mask)
+                self.forbidden[color] = forbidden
+                self.corners[color] = (old_corners | self.diagonal(mask)) & ~forbidden
+            else:
+                self.forbidden[other] |= mask
+                self.corners[other] = old_corners & ~mask
+            changed |= old_corners ^ self.corners[other]
+        return changed
+
+    def update_masks(self, colors: list[str] = None):
+        """
+        Recompute forbidden and corner masks from occupancy
+        :param colors: Colors to update, all colors by default
+        """
+        for color in (self.owned.keys() if colors is None else colors):
+            owned = self.owned[color]
+            forbidden = self.occupied | self.adjacent(owned)
+            self.forbidden[color] = forbidden
+            self.corners[color] = (self.diagonal(owned) | self.starts[color]) & self.board_mask & ~forbidden
+
+    def iter_cells(self, mask: int):
+        """
+        Iterate the cells in a mask
+        :param mask: Mask to iterate
+        :return: Generator of (x, y)
+        """
+        while mask:
+            low = mask & -mask
+            y, x = divmod(low.bit_length() - 1, self.stride)
+            yield x, y
+            mask ^= low
+
+    def to_array(self, mask: int) -> np.ndarray:
+        """
+        Convert a mask to a boolean array indexed [x][y]
+        :param mask: Mask to convert
+        :return: Array of shape (width, height)
+        """
+        size = self.height * self.stride
+        raw = np.frombuffer(mask.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8)
+        bits = np.unpackbits(raw, bitorder='little')[:size].astype(bool)
+        return bits.reshape(self.height, self.stride)[:, :self.width].T
@@ -27,7 +27,8 @@ class Tetros:
                  players: list[Player] = None,
                  starting_positions: list[[int, int]] = None,
                  display_modes: list[str] = None,
-                 logging_modes: list[str] = None):
+                 logging_modes: list[str] = None,
+                 seed: int = None):
         """
         Declare a game object
         :param board_size: (x,y) Size of the board
@@ -36,15 +37,23 @@ class Tetros:
         :param starting_positions: Starting positions for each player
         :param display_modes: List of strings to control output to the console
         :param logging_modes: List of strings to control logging
+        :param seed: Seed for the game's random number generator, drawn from the random module if None
         """
+        # Every random choice in the game, seating, starting positions and the players' moves, comes from self.rng
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
         self.initial_pieces = ObjectFactory().generate_shapes() if initial_pieces is None else initial_pieces
         self.players = ObjectFactory.generate_human_players(initial_pieces=initial_pieces) \
             if players is None else players
-        random.shuffle(self.players)
-        self.board = GameBoard((board_size[0], board_size[1]), self.players, starting_positions)
+        self.rng.shuffle(self.players)
+        for player in self.players:
+            player.rng = self.rng
+        self.board = GameBoard((board_size[0], board_size[1]), self.players, starting_positions, self.rng)
         self.display_modes = display_modes if display_modes is not None else ['final_board', 'scores', 'end_pause']
         self.logging_modes = logging_modes if logging_modes is not None else []
         self.turn_times = []
+        # color => seconds spent in the player's turns
+        self.player_times = {}
         self.uuid = uuid.uuid4()
 
     def check_any_player_win(self):
@@ -58,21 +67,28 @@ class Tetros:
                 winners.append(player)
         return winners
 
-    def play_game(self):
+    def play_game(self, max_rounds: int = None):
         """
         Play a game of Tetros
+        :param max_rounds: Stop after this many rounds, play to the end if None
         """
         turns = 0
         turn_timer = timer()
         self.turn_times = []
+        self.player_times = {}
         game_replay_data = {}
-        while not (self.board.is_stalemate(self.players) or self.check_any_player_win()):
+        while not (self.board.is_stalemate(self.players) or self.check_any_player_win()) and \
+                (max_rounds is None or turns < max_rounds):
             turns += 1
             for player in self.players:
-                if not player.has_knocked and player.take_turn(self.board):
-                    # Player has placed a piece
-                    self.board.update_placeable_lists(self.players)
-                else:
+                self.board.set_player_to_move(player.color)
+                player_timer = timer()
+                if not player.has_knocked and not self.board.has_legal_move(player):
+                    # Player can never place again
+                    player.has_knocked = True
+                placed = not player.has_knocked and player.take_turn(self.board)
+                self.player_times[player.color] = self.player_times.get(player.color, 0) + timer() - player_timer
+                if not placed:
                     # Player skips their turn
                     skip_msg = colored(player.color, player.color) + \
                           ' skipped as they can''t place a piece.'
@@ -104,6 +120,7 @@ class Tetros:
             print(bottom_row)
         if 'game_replay' in self.logging_modes:
             game_replay_data['players'] = [str(player) for player in self.players]
+            game_replay_data['seed'] = self.seed
             game_replay_data['scores'] = self.get_printable_scores()
             log_filename = f'GameReplays/GameReplay-{self.uuid}.json'
             with open(log_filename, 'w') as write_file:
@@ -186,7 +203,7 @@ class Tetros:
             }
             if player.squares_left() == 0:
                 player_score['Points'] += 15
-                if player.final_piece is not None and len(player.final_piece.currentCoords) == 1:
+                if player.final_piece is not None and player.final_piece.size == 1:
                     player_score['Points'] += 5
             players_scores[player.color] = player_score
         winners = self.find_winner(players_scores)
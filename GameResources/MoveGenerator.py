@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import numpy as np
+import GameResources as GR
+
+from GameResources.Structure import Piece, GameBoard
+
+
+class MoveGenerator:
+    """
+    Vectorised legal move generation.
+    Moves are returned as parallel arrays (piece_ids, orientation_ids, xs, ys), where orientation_ids index
+    ObjectFactory.get_orientations for the piece and (x, y) is the offset of the normalised orientation coords.
+    """
+    # Orientation tuple => (dx, dy, valid) arrays of shape (orientations, cells)
+    ORIENTATION_CELLS = {}
+
+    @staticmethod
+    def get_masks(board: GameBoard, color: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the forbidden and corner masks for a player as arrays
+        :param board: The game board
+        :param color: Player color
+        :return: (forbidden, corners) boolean arrays indexed [x][y]
+        """
+        bitboard = board.bitboard
+        return bitboard.to_array(bitboard.forbidden[color]), bitboard.to_array(bitboard.corners[color])
+
+    @staticmethod
+    def generate_moves(board: GameBoard,
+                       color: str,
+                       pieces: list[Piece]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Generate every legal placement of the given pieces
+        For each orientation the forbidden mask is shifted under every cell and OR-ed, the same is done for the
+        corner mask, a placement is legal where it touches a corner and covers nothing forbidden.
+        :param board: The game board
+        :param color: Player color
+        :param pieces: Pieces to place, piece_ids index this list
+        :return: (piece_ids, orientation_ids, xs, ys)
+        """
+        if color not in board.bitboard.corners or not board.bitboard.corners[color]:
+            return MoveGenerator.empty_moves()
+        forbidden, corners = MoveGenerator.get_masks(board, color)
+        width, height = forbidden.shape
+        piece_ids, orientation_ids, xs, ys = [], [], [], []
+        for piece_id, piece in enumerate(pieces):
+            for orientation_id, orientation in enumerate(GR.ObjectFactory.ObjectFactory.get_orientations(piece.currentCoords)):
+                span_x = width - orientation.width + 1
+                span_y = height - orientation.height + 1
+                if span_x <= 0 or span_y <= 0:
+                    continue
+                blocked = np.zeros((span_x, span_y), dtype=bool)
+                touching = np.zeros((span_x, span_y), dtype=bool)
+                for dx, dy in orientation.coords:
+                    blocked |= forbidden[dx:dx + span_x, dy:dy + span_y]
+                    touching |= corners[dx:dx + span_x, dy:dy + span_y]
+                legal_x, legal_y = np.nonzero(touching & ~blocked)
+                if len(legal_x):
+                    piece_ids.append(np.full(len(legal_x), piece_id))
+                    orientation_ids.append(np.full(len(legal_x), orientation_id))
+                    xs.append(legal_x)
+                    ys.append(legal_y)
+        if not xs:
+            return MoveGenerator.empty_moves()
+        return np.concatenate(piece_ids), np.concatenate(orientation_ids), np.concatenate(xs), np.concatenate(ys)
+
+    @staticmethod
+    def empty_moves() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: Empty move arrays
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+
+    @staticmethod
+    def get_orientation_cells(piece: Piece) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the cell offsets of every orientation of a piece as padded arrays
+        :param piece: Piece to look up
+        :return: (dx, dy, valid) arrays of shape (orientations, cells), padding cells are (0, 0) and not valid
+        """
+        orientations = GR.ObjectFactory.ObjectFactory.get_orientations(piece.currentCoords)
+        cells = MoveGenerator.ORIENTATION_CELLS.get(orientations)
+        if cells is None:
+            size = len(orientations[0].coords)
+            dx = np.zeros((len(orientations), size), dtype=np.int64)
+            dy = np.zeros((len(orientations), size), dtype=np.int64)
+            for orientation_id, orientation in enumerate(orientations):
+                dx[orientation_id] = [coord[0] for coord in orientation.coords]
+                dy[orientation_id] = [coord[1] for coord in orientation.coords]
+            cells = (dx, dy, np.ones((len(orientations), size), dtype=bool))
+            MoveGenerator.ORIENTATION_CELLS[orientations] = cells
+        return cells
+
+    @staticmethod
+    def get_cells(pieces: list[Piece],
+                  piece_ids: np.ndarray,
+                  orientation_ids: np.ndarray,
+                  xs: np.ndarray,
+                  ys: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the board cells covered by each move
+        :param pieces: Pieces the piece_ids index
+        :param piece_ids: Piece of each move
+        :param orientation_ids: Orientation of each move
+        :param xs: x offset of each move
+        :param ys: y offset of each move
+        :return: (cell_xs, cell_ys, valid) arrays of shape (moves, cells), padding cells repeat (x, y) and are not valid
+        """
+        tables = [MoveGenerator.get_orientation_cells(piece) for piece in pieces]
+        size = max(table[0].shape[1] for table in tables)
+        rows = sum(table[0].shape[0] for table in tables)
+        dx = np.zeros((rows, size), dtype=np.int64)
+        dy = np.zeros((rows, size), dtype=np.int64)
+        valid = np.zeros((rows, size), dtype=bool)
+        offsets = np.zeros(len(tables), dtype=np.int64)
+        row = 0
+        for piece_id, (piece_dx, piece_dy, piece_valid) in enumerate(tables):
+            offsets[piece_id] = row
+            dx[row:row + len(piece_dx), :piece_dx.shape[1]] = piece_dx
+            dy[row:row + len(piece_dy), :piece_dy.shape[1]] = piece_dy
+            valid[row:row + len(piece_valid), :piece_valid.shape[1]] = piece_valid
+            row += len(piece_dx)
+        move_rows = offsets[piece_ids] + orientation_ids
+        return xs[:, None] + dx[move_rows], ys[:, None] + dy[move_rows], valid[move_rows]
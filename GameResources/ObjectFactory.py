@@ -1,5 +1,6 @@
 from Players.SimplePlayers import *
 from Players.AlgorithmicPlayers import StaticHeatmapPlayer
+from GameResources.Structure import Orientation, FrozenPiece
 
 
 @dataclass
@@ -91,6 +92,55 @@ class ObjectFactory:
         }
     }
 
+    # Shape coords => tuple of distinct orientations, shared by every shape with the same canonical form
+    ORIENTATIONS = {}
+    CANONICAL_ORIENTATIONS = {}
+
+    @staticmethod
+    def get_orientations(shape: list) -> tuple[Orientation, ...]:
+        """
+        Get the distinct orientations of a shape, computed once per process
+        Orientation IDs are indexes into the returned tuple, they don't depend on how the shape is currently rotated
+        :param shape: List of relative coordinates
+        :return: Tuple of orientations
+        """
+        # FrozenPiece coords are already a valid key
+        orientations = ObjectFactory.ORIENTATIONS.get(shape) if isinstance(shape, tuple) else None
+        if orientations is not None:
+            return orientations
+        key = tuple((int(coord[0]), int(coord[1])) for coord in shape)
+        orientations = ObjectFactory.ORIENTATIONS.get(key)
+        if orientations is None:
+            transformed = set()
+            coords = key
+            for rotation in range(4):
+                # Rotate 90 degrees clockwise, then also try the flip about the Y axis
+                coords = tuple((-y, x) for x, y in coords)
+                for flipped in (coords, tuple((-x, y) for x, y in coords)):
+                    minx = min(x for x, y in flipped)
+                    miny = min(y for x, y in flipped)
+                    transformed.add(tuple(sorted((x - minx, y - miny) for x, y in flipped)))
+            transformed = sorted(transformed)
+            canonical = transformed[0]
+            orientations = ObjectFactory.CANONICAL_ORIENTATIONS.get(canonical)
+            if orientations is None:
+                orientations = tuple(Orientation(coords,
+                                                 max(x for x, y in coords) + 1,
+                                                 max(y for x, y in coords) + 1) for coords in transformed)
+                ObjectFactory.CANONICAL_ORIENTATIONS[canonical] = orientations
+            ObjectFactory.ORIENTATIONS[key] = orientations
+        return orientations
+
+    @staticmethod
+    def generate_orientation_table(shapes: dict = None) -> dict[str, tuple[Orientation, ...]]:
+        """
+        Get the distinct orientations of every shape in a shape set
+        :param shapes: Shape dict in the format of STANDARD_SHAPES, STANDARD_SHAPES by default
+        :return: Shape name => Tuple of orientations
+        """
+        shapes = ObjectFactory.STANDARD_SHAPES.values() if shapes is None else shapes.values()
+        return {shape['name']: ObjectFactory.get_orientations(shape['coords']) for shape in shapes}
+
     @staticmethod
     def generate_shapes(player_colors: list = None, shapes: dict = None):
         ret = []
@@ -99,7 +149,7 @@ class ObjectFactory:
         for color in player_colors:
             player_shapes = []
             for shape in shapes:
-                player_shapes.append(Piece(shape['name'], shape['coords'], color))
+                player_shapes.append(FrozenPiece(shape['name'], shape['coords'], color))
             ret.append(player_shapes)
         return ret
 
@@ -108,56 +158,56 @@ class ObjectFactory:
         shapes = ObjectFactory.STANDARD_SHAPES.values()
         player_shapes = []
         for shape in shapes:
-            player_shapes.append(Piece(shape['name'], shape['coords'], color))
+            player_shapes.append(FrozenPiece(shape['name'], shape['coords'], color))
         return player_shapes
 
     @staticmethod
-    def generate_human_players(player_colors: list = None, initial_pieces: dict = None) -> list[HumanPlayer]:
+    def generate_human_players(player_colors: list = None, initial_pieces: dict = None, rng: random.Random = None) -> list[HumanPlayer]:
         ret = []
         player_colors = ['blue', 'green', 'red', 'yellow'] if player_colors is None else player_colors
         initial_pieces = ObjectFactory().generate_shapes() if initial_pieces is None else initial_pieces
         for i in range(0, len(player_colors)):
             ret.append(HumanPlayer(player_colors[i], initial_pieces[i]))
-        random.shuffle(ret)
+        (rng if rng is not None else random).shuffle(ret)
         return ret
 
     @staticmethod
-    def generate_random_players(player_colors: list = None, initial_pieces: dict = None) -> list[RandomPlayer]:
+    def generate_random_players(player_colors: list = None, initial_pieces: dict = None, rng: random.Random = None) -> list[RandomPlayer]:
         ret = []
         player_colors = ['blue', 'green', 'red', 'yellow'] if player_colors is None else player_colors
         initial_pieces = ObjectFactory().generate_shapes() if initial_pieces is None else initial_pieces
         for i in range(0, len(player_colors)):
             ret.append(RandomPlayer(player_colors[i], initial_pieces[i]))
-        random.shuffle(ret)
+        (rng if rng is not None else random).shuffle(ret)
         return ret
 
     @staticmethod
-    def generate_ex_random_players(player_colors: list = None, initial_pieces: dict = None) -> list[ExhaustiveRandomPlayer]:
+    def generate_ex_random_players(player_colors: list = None, initial_pieces: dict = None, rng: random.Random = None) -> list[ExhaustiveRandomPlayer]:
         ret = []
         player_colors = ['blue', 'green', 'red', 'yellow'] if player_colors is None else player_colors
         initial_pieces = ObjectFactory().generate_shapes() if initial_pieces is None else initial_pieces
         for i in range(0, len(player_colors)):
             ret.append(ExhaustiveRandomPlayer(player_colors[i], initial_pieces[i]))
-        random.shuffle(ret)
+        (rng if rng is not None else random).shuffle(ret)
         return ret
 
     @staticmethod
-    def generate_shm_players(board_size: tuple[int, int], player_colors: list = None, initial_pieces: dict = None) -> list[StaticHeatmapPlayer]:
+    def generate_shm_players(board_size: tuple[int, int], player_colors: list = None, initial_pieces: dict = None, rng: random.Random = None) -> list[StaticHeatmapPlayer]:
         ret = []
         player_colors = ['blue', 'green', 'red', 'yellow'] if player_colors is None else player_colors
         initial_pieces = ObjectFactory().generate_shapes() if initial_pieces is None else initial_pieces
         for i in range(0, len(player_colors)):
-            ret.append(StaticHeatmapPlayer(player_colors[i], initial_pieces[i], 'Players/heatmaps/aggressive.txt'))
-        random.shuffle(ret)
+            ret.append(StaticHeatmapPlayer(player_colors[i], 'Players/heatmaps/aggressive.txt', initial_pieces[i]))
+        (rng if rng is not None else random).shuffle(ret)
         return ret
 
     @staticmethod
-    def generate_smh_v_random(board_size: tuple[int, int]) -> list[Player]:
+    def generate_smh_v_random(board_size: tuple[int, int], rng: random.Random = None) -> list[Player]:
         ret = []
         initial_pieces = ObjectFactory().generate_shapes()
-        ret.append(StaticHeatmapPlayer('blue', initial_pieces[0], 'Players/heatmaps/bullseye.txt'))
-        ret.append(StaticHeatmapPlayer('green', initial_pieces[1], 'Players/heatmaps/bullseye.txt'))
+        ret.append(StaticHeatmapPlayer('blue', 'Players/heatmaps/bullseye.txt', initial_pieces[0]))
+        ret.append(StaticHeatmapPlayer('green', 'Players/heatmaps/bullseye.txt', initial_pieces[1]))
         ret.append(ExhaustiveRandomPlayer('red', initial_pieces[2]))
         ret.append(ExhaustiveRandomPlayer('yellow', initial_pieces[3]))
-        random.shuffle(ret)
+        (rng if rng is not None else random).shuffle(ret)
         return ret
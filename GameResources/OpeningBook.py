@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import numpy as np
+import Players
+
+from typing import Callable
+from GameResources.Structure import GameBoard, Piece
+
+BOOK_DTYPE = np.dtype([('key', '<u8'), ('piece', 'u1'), ('orientation', 'u1'), ('x', 'u1'), ('y', 'u1')])
+
+
+class OpeningBook:
+    """
+    Table of known moves for the first few turns of a game.
+    Positions are keyed by the side to move's own placements, starting corner and the board size. Opponents' moves are
+    left out, so a line is found whatever they played, and the player checks the book move is still legal. One book
+    serves every starting corner and board size. A book belongs to one player configuration, build one per config.
+    While learning, moves are chosen by the teacher, a stronger search player, when one is set.
+    The table is an open addressing hash table with linear probing, saved as a .npy file and memory mapped on load,
+    so a lookup reads a handful of slots from disk.
+    """
+    def __init__(self, turns: int = 4, capacity: int = 1024):
+        """
+        Create an empty book to add moves to
+        :param turns: Number of turns the book covers for each player
+        :param capacity: Initial number of slots, rounded up to a power of 2
+        """
+        self.turns = turns
+        self.table = np.zeros(1 << max(capacity - 1, 1).bit_length(), dtype=BOOK_DTYPE)
+        self.size = 0
+        self.path = None
+        # Players add moves to a learning book, chosen by the teacher if there is one
+        self.learning = False
+        # (color, hand) => player whose select_move picks the moves to learn, None to learn the player's own moves
+        self.teacher: Callable[[str, list[Piece]], Players.SimplePlayers.Player] | None = None
+
+    def __deepcopy__(self, memo: dict) -> OpeningBook:
+        # Books are shared between copies of a player rather than copying the table
+        return self
+
+    def __reduce__(self):
+        # Memory mapped books are reopened from their file when sent to another process
+        if self.path is not None:
+            return OpeningBook.load, (self.path, self.turns)
+        return object.__reduce__(self)
+
+    @staticmethod
+    def get_key(board: GameBoard) -> int:
+        """
+        Get the book key of the side to move, from its own placements and starting corner, and the board size
+        :param board: Current game-board
+        :return: Non-zero 64-bit key, 0 marks an empty slot
+        """
+        color = board.to_move
+        key = board.zobrist_key('book', board.get_size()) ^ board.zobrist_key('start', board.bitboard.starts[color])
+        for move_color, name, mask in board.move_history:
+            if move_color == color:
+                key ^= board.zobrist_key('book move', name, mask)
+        return key or 1
+
+    def find_slot(self, key: int) -> int:
+        """
+        Find the slot holding key, or the empty slot it would go in
+        :param key: Book key
+        :return: Slot index
+        """
+        table = self.table
+        mask = len(table) - 1
+        slot = key & mask
+        while True:
+            slot_key = int(table[slot]['key'])
+            if slot_key == key or slot_key == 0:
+                return slot
+            slot = (slot + 1) & mask
+
+    def lookup(self, board: GameBoard) -> Players.SimplePlayers.PackedMove | None:
+        """
+        Get the book move for the player to move
+        :param board: Current game-board
+        :return: Move for the player's current hand, None if the position isn't in the book
+        """
+        key = self.get_key(board)
+        entry = self.table[self.find_slot(key)]
+        if int(entry['key']) != key:
+            return None
+        return Players.SimplePlayers.PackedMove(int(entry['piece']), int(entry['orientation']),
+                                                (int(entry['x']), int(entry['y'])))
+
+    def add(self, board: GameBoard, move: Players.SimplePlayers.PackedMove):
+        """
+        Add or replace the move for a position, growing the table to keep it at most half full
+        :param board: Board before the move
+        :param move: Move selected in this position
+        """
+        if self.path is not None:
+            raise ValueError('A loaded opening book is read only')
+        if (self.size + 1) * 2 > len(self.table):
+            self.resize(len(self.table) * 2)
+        key = self.get_key(board)
+        slot = self.find_slot(key)
+        if int(self.table[slot]['key']) == 0:
+            self.size += 1
+        self.table[slot] = (key, move.piece_index, move.orientation_id, move.position[0], move.position[1])
+
+    def teach(self,
+              board: GameBoard,
+              player: Players.SimplePlayers.Player) -> Players.SimplePlayers.Move | Players.SimplePlayers.PackedMove | None:
+        """
+        Choose the move for a learning player and add it to the book
+        :param board: Current game-board, the player is to move
+        :param player: Player the book is learning for
+        :return: The teacher's move, or the player's own without a teacher
+        """
+        if self.teacher is None:
+            move = player.select_move(board)
+        else:
+            teacher = self.teacher(player.color, list(player.pieces))
+            teacher.rng = player.rng
+            move = teacher.select_move(board)
+        if isinstance(move, Players.SimplePlayers.PackedMove):
+            self.add(board, move)
+        return move
+
+    def resize(self, capacity: int):
+        """
+        Rehash every entry into a table of capacity slots
+        :param capacity: New number of slots, a power of 2
+        """
+        old_table = self.table
+        self.table = np.zeros(capacity, dtype=BOOK_DTYPE)
+        for entry in old_table[old_table['key'] != 0]:
+            self.table[self.find_slot(int(entry['key']))] = entry
+
+    def save(self, filepath: str):
+        """
+        Write the table to a .npy file
+        :param filepath: File path to write to
+        """
+        np.save(filepath, self.table)
+
+    @staticmethod
+    def load(filepath: str, turns: int = 4) -> OpeningBook:
+        """
+        Memory map a saved book
+        :param filepath: .npy file path
+        :param turns: Number of turns to use the book for
+        :return: Read only book
+        """
+        book = OpeningBook(turns)
+        book.table = np.load(filepath, mmap_mode='r')
+        book.size = int(np.count_nonzero(book.table['key']))
+        book.path = filepath
+        return book
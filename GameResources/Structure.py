@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import random
 import Players
 import GameResources as GR
@@ -7,6 +8,7 @@ import GameResources as GR
 from dataclasses import dataclass
 from termcolor2 import colored
 from numpy import matmul
+from GameResources.BitBoard import BitBoard
 
 
 class Piece:
@@ -59,33 +61,45 @@ class Piece:
     def get_dimension(self, axis: str) -> int:
         return self.max_xy(axis) - self.min_xy(axis)
 
-    def rotate(self):
+    @property
+    def size(self) -> int:
+        """
+        Number of squares in the piece
+        """
+        return len(self.currentCoords)
+
+    def rotate(self) -> Piece:
         """
         Rotate the piece 90 degrees clockwise
         Source: https://en.wikipedia.org/wiki/Rotations_and_reflections_in_two_dimensions
+        :return: self, so callers can treat Piece and FrozenPiece the same way
         """
         rotation_matrix = [[0, 1], [-1, 0]]
         for i in range(len(self.currentCoords)):
             self.currentCoords[i] = list(matmul(self.currentCoords[i], rotation_matrix))
+        return self
 
-    def flip(self):
+    def flip(self) -> Piece:
         """
         Flip Piece about Y axis
         source: https://en.wikipedia.org/wiki/Rotations_and_reflections_in_two_dimensions
+        :return: self, so callers can treat Piece and FrozenPiece the same way
         """
         reflection_matrix = [[-1, 0], [0, 1]]
         for i in range(len(self.currentCoords)):
             self.currentCoords[i] = list(matmul(self.currentCoords[i], reflection_matrix))
+        return self
 
     def get_printable_shape(self) -> str:
         """
         Return a string with the piece printed as a shape
         :return: A string with a representation of the shape to be printed to cli
         """
+        cells = {(coord[0], coord[1]) for coord in self.currentCoords}
         ret = ''
         for y in range(self.min_xy('y'), self.max_xy('y') + 1):
             for x in range(self.min_xy('x'), self.max_xy('x') + 1):
-                if [x, y] in self.currentCoords:
+                if (x, y) in cells:
                     if x == 0 and y == 0:
                         ret += colored('▣ ', self.color)
                     else:
@@ -100,11 +114,12 @@ class Piece:
         Return a string with the pieces printed as a shapes
         :return: A String with all the shapes printed horizontally
         """
+        cells = {(coord[0], coord[1]) for coord in self.currentCoords}
         lines = []
         for y in range(self.min_xy('y'), self.max_xy('y') + 1):
             line = ''
             for x in range(self.min_xy('x'), self.max_xy('x') + 1):
-                if [x, y] in self.currentCoords:
+                if (x, y) in cells:
                     if x == 0 and y == 0:
                         line += colored('▣ ', self.color)
                     else:
@@ -115,6 +130,114 @@ class Piece:
         return lines
 
 
+class FrozenPiece:
+    """
+    Immutable Piece with tuple coords and a cached bounding box.
+    rotate() and flip() return new pieces, so one FrozenPiece can be shared between hands, moves and games.
+    """
+    __slots__ = ('name', 'currentCoords', 'color', 'size', 'bounds', '_hash')
+
+    def __init__(self, name: str, shape: list | tuple, color: str):
+        """
+        Create a FrozenPiece
+        :param name: Piece name
+        :param shape: Relative coordinates
+        :param color: Piece color
+        """
+        coords = tuple((int(coord[0]), int(coord[1])) for coord in shape)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'currentCoords', coords)
+        object.__setattr__(self, 'color', color)
+        object.__setattr__(self, 'size', len(coords))
+        object.__setattr__(self, 'bounds', (min(x for x, y in coords), min(y for x, y in coords),
+                                            max(x for x, y in coords), max(y for x, y in coords)))
+        object.__setattr__(self, '_hash', hash((name, coords, color)))
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, key):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self):
+        return FrozenPiece, (self.name, self.currentCoords, self.color)
+
+    def __copy__(self) -> FrozenPiece:
+        return self
+
+    def __deepcopy__(self, memo: dict) -> FrozenPiece:
+        return self
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FrozenPiece):
+            return NotImplemented
+        return (self.name, self.currentCoords, self.color) == (other.name, other.currentCoords, other.color)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __str__(self):
+        return '[' + self.name + ', ' + str(self.currentCoords) + ', ' + self.color + ']'
+
+    def min_xy(self, axis: str) -> int:
+        """
+        Minimum x or y value
+        :param axis: x or y: x=0, y=1
+        :return: Min of either x or y
+        """
+        return self.bounds[0] if axis == 'x' else self.bounds[1]
+
+    def max_xy(self, axis: str) -> int:
+        """
+        Maximum x or y value
+        :param axis: x or y: x=0, y=1
+        :return: Max of either x or y
+        """
+        return self.bounds[2] if axis == 'x' else self.bounds[3]
+
+    def get_dimension(self, axis: str) -> int:
+        return self.max_xy(axis) - self.min_xy(axis)
+
+    def rotate(self) -> FrozenPiece:
+        """
+        Rotate the piece 90 degrees clockwise, see Piece.rotate
+        :return: The rotated piece
+        """
+        return FrozenPiece(self.name, [(-y, x) for x, y in self.currentCoords], self.color)
+
+    def flip(self) -> FrozenPiece:
+        """
+        Flip Piece about Y axis, see Piece.flip
+        :return: The flipped piece
+        """
+        return FrozenPiece(self.name, [(-x, y) for x, y in self.currentCoords], self.color)
+
+    def get_printable_shape(self) -> str:
+        """
+        Return a string with the piece printed as a shape
+        :return: A string with a representation of the shape to be printed to cli
+        """
+        return Piece.get_printable_shape(self)
+
+    def get_printable_shape_lines(self) -> list[str]:
+        """
+        Return a string with the pieces printed as a shapes
+        :return: A String with all the shapes printed horizontally
+        """
+        return Piece.get_printable_shape_lines(self)
+
+
+@dataclass(frozen=True)
+class Orientation:
+    """
+    Dataclass to store one distinct orientation of a shape
+    Coords are normalised so the minimum x and y are 0, width and height are the bounding box size
+    """
+    coords: tuple[tuple[int, int], ...]
+    width: int
+    height: int
+
+
 @dataclass
 class BoardSquare:
     """
@@ -125,14 +248,19 @@ class BoardSquare:
 
 
 class GameBoard:
+    # Zobrist key cache, keys are derived from a digest of their parts so they are stable across processes
+    ZOBRIST_KEYS = {}
+
     def __init__(self,
                  board_size: tuple[int, int],
                  players: list[Players.SimplePlayers.Player],
-                 starting_positions: list[[int, int]] = None):
+                 starting_positions: list[[int, int]] = None,
+                 rng: random.Random = None):
         """ Initialize a board of board_size * board_size
         :param board_size: Size of the board (x,y)
         :param players: Players who are playing
         :param starting_positions: Optional starting positions
+        :param rng: Random number generator for shuffling the starting positions, the random module if None
         """
         self.positions = []
         for y in range(0, board_size[1]):
@@ -140,11 +268,60 @@ class GameBoard:
             for x in range(0, board_size[0]):
                 row.append(BoardSquare([]))
             self.positions.append(row)
-        self.starting_positions = starting_positions
-        self.set_starting_positions(players)
         self.player_colors = []
         for player in players:
             self.player_colors.append(player.color)
+        self.bitboard = BitBoard(self.get_size(), self.player_colors)
+        # Current corner locations for each player, kept in step with the bitboard corner masks
+        self.corner_index = {color: set() for color in self.player_colors}
+        # Cached (legal move existence, hand size) for each player, None when it needs recalculating
+        self.mobility = {color: None for color in self.player_colors}
+        # Cells a placement must touch to invalidate a cached True, any move found could use them
+        self.mobility_reach = {color: 0 for color in self.player_colors}
+        # Records of moves made with apply_move, popped by undo_move
+        self.undo_stack = []
+        # Pieces each player started with and the names of those placed since, so any player's hand can be recovered
+        self.initial_hands = {player.color: list(player.pieces) for player in players}
+        self.placed_pieces = {color: set() for color in self.player_colors}
+        # (color, piece name, placed mask) of every move in order
+        self.move_history = []
+        # Zobrist hash of cell ownership, the player to move and every player's remaining pieces
+        self.to_move = self.player_colors[0] if self.player_colors else None
+        self.zobrist_hash = self.zobrist_key('turn', self.to_move)
+        for player in players:
+            for piece in player.pieces:
+                self.zobrist_hash ^= self.zobrist_key('piece', player.color, piece.name)
+        self.starting_positions = starting_positions
+        self.set_starting_positions(players, rng)
+
+    @staticmethod
+    def zobrist_key(*parts) -> int:
+        """
+        Get the 64-bit Zobrist key for a feature of the position
+        :param parts: Feature description e.g. ('cell', x, y, color)
+        :return: 64-bit key
+        """
+        key = GameBoard.ZOBRIST_KEYS.get(parts)
+        if key is None:
+            digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+            key = int.from_bytes(digest, 'little')
+            GameBoard.ZOBRIST_KEYS[parts] = key
+        return key
+
+    def state_hash(self) -> int:
+        """
+        Get a hash identifying the current position
+        :return: 64-bit Zobrist hash
+        """
+        return self.zobrist_hash
+
+    def set_player_to_move(self, color: str):
+        """
+        Set the player whose turn it is
+        :param color: Player color
+        """
+        self.zobrist_hash ^= self.zobrist_key('turn', self.to_move) ^ self.zobrist_key('turn', color)
+        self.to_move = color
 
     def get_size(self) -> tuple[int, int]:
         """
@@ -153,33 +330,104 @@ class GameBoard:
         """
         return len(self.positions), len(self.positions[0])
 
-    def set_starting_positions(self, players: list[Players.SimplePlayers.Player]):
+    def set_starting_positions(self, players: list[Players.SimplePlayers.Player], rng: random.Random = None):
         """
         Set stating positions for players
         Make the locations in starting_positions placeable for corresponding players
         :param players: Players to set starting positions for
+        :param rng: Random number generator for the shuffle, the random module if None
         """
         xmax = len(self.positions) - 1
         ymax = len(self.positions[0]) - 1
+        # Shuffle a copy, the list passed in may be shared between games
         self.starting_positions = [[0, 0], [xmax, ymax], [0, ymax], [xmax, 0]] \
-            if self.starting_positions is None else self.starting_positions
-        random.shuffle(self.starting_positions)
+            if self.starting_positions is None else list(self.starting_positions)
+        (rng if rng is not None else random).shuffle(self.starting_positions)
         for i in range(len(players)):
             x, y = self.starting_positions[i]
             self.positions[x][y].placeable_by.append(players[i].color)
+            self.bitboard.add_start(x, y, players[i].color)
+            self.corner_index[players[i].color].add((x, y))
+
+    def get_hand(self, color: str) -> list[GR.Structure.Piece]:
+        """
+        Get the pieces a player has not placed yet, in their starting order
+        :param color: Player color
+        :return: Remaining pieces
+        """
+        placed = self.placed_pieces.get(color, ())
+        return [piece for piece in self.initial_hands.get(color, ()) if piece.name not in placed]
+
+    def get_corners(self, color: str) -> list[tuple[int, int]]:
+        """
+        Get the current corner locations for a player
+        :param color: Player color
+        :return: All placeable locations for color
+        """
+        return list(self.corner_index.get(color, ()))
 
     def is_stalemate(self, players: list[Players.SimplePlayers.Player]) -> bool:
         """
         Is the board a stalemate?
-        Either no placeable locations or all players have knocked
+        Either no player has a legal move or all players have knocked
         :param players: List of players
         :return: bool
         """
         for player in players:
-            if player.get_placeables(self) and not player.has_knocked:
+            if not player.has_knocked and self.has_legal_move(player):
                 return False
         return True
 
+    def has_legal_move(self, player: Players.SimplePlayers.Player) -> bool:
+        """
+        Can the player place any of their pieces?
+        The result is cached until a placement touches the area around the player's corners or their hand changes
+        :param player: Player to check
+        :return: bool
+        """
+        cached = self.mobility.get(player.color)
+        if cached is not None and cached[1] == len(player.pieces):
+            return cached[0]
+        mobility = self.find_legal_move(player.color, player.pieces)
+        if player.color in self.mobility:
+            self.mobility[player.color] = (mobility, len(player.pieces))
+            if mobility:
+                max_size = max(len(piece.currentCoords) for piece in player.pieces)
+                self.mobility_reach[player.color] = self.bitboard.expand(self.bitboard.corners[player.color],
+                                                                         max_size - 1)
+        return mobility
+
+    def find_legal_move(self, color: str, pieces: list[GR.Structure.Piece]) -> bool:
+        """
+        Search for any legal placement, smallest pieces first, stopping at the first one found
+        :param color: Player color
+        :param pieces: Pieces to try
+        :return: True if any piece fits
+        """
+        corners = self.get_corners(color)
+        if not corners:
+            return False
+        for piece in sorted(pieces, key=lambda sorted_piece: len(sorted_piece.currentCoords)):
+            for orientation in GR.ObjectFactory.ObjectFactory.get_orientations(piece.currentCoords):
+                for corner_x, corner_y in corners:
+                    for dx, dy in orientation.coords:
+                        mask = self.bitboard.shape_mask(orientation.coords, corner_x - dx, corner_y - dy)
+                        if mask is not None and self.bitboard.fits(mask, color):
+                            return True
+        return False
+
+    def invalidate_mobility(self, mask: int, color: str):
+        """
+        Clear cached legal move results affected by a placement
+        A player with no legal moves can never regain one, unless they were the player who placed
+        :param mask: Mask of the placement
+        :param color: Color of the player who placed
+        """
+        for other in self.mobility:
+            cached = self.mobility[other]
+            if other == color or (cached is not None and cached[0] and mask & self.mobility_reach[other]):
+                self.mobility[other] = None
+
     def check_adjacent_squares(self, x: int, y: int, color: str) -> bool:
         """
         Check adjacent squares for same colored tiles
@@ -189,15 +437,8 @@ class GameBoard:
         :param color: Player color
         :return: bool
         """
-        if x > 0 and self.positions[x - 1][y].color == color:
-            return True
-        if x < len(self.positions) - 1 and self.positions[x + 1][y].color == color:
-            return True
-        if y > 0 and self.positions[x][y - 1].color == color:
-            return True
-        if y < len(self.positions[0]) - 1 and self.positions[x][y + 1].color == color:
-            return True
-        return False
+        bitboard = self.bitboard
+        return bool(bitboard.adjacent(bitboard.cell_mask(x, y)) & bitboard.owned.get(color, 0))
 
     def check_diagonal_squares(self, x: int, y: int, color: str) -> bool:
         """
@@ -208,72 +449,147 @@ class GameBoard:
         :param color: Player color
         :return: bool
         """
-        mini = 0
-        maxi = len(self.positions) - 1
-        if x > mini and y > mini and self.positions[x - 1][y - 1].color == color:
-            return True
-        if x > mini and y < maxi and self.positions[x - 1][y + 1].color == color:
-            return True
-        if x < maxi and y > mini and self.positions[x + 1][y - 1].color == color:
-            return True
-        if x < maxi and y < maxi and self.positions[x + 1][y + 1].color == color:
-            return True
-        return False
+        bitboard = self.bitboard
+        return bool(bitboard.diagonal(bitboard.cell_mask(x, y)) & bitboard.owned.get(color, 0))
+
+    @staticmethod
+    def get_piece_coords(piece: GR.Structure.Piece, orientation_id: int = None) -> list:
+        """
+        Get the coords a piece will be placed with
+        :param piece: Piece to place
+        :param orientation_id: Optional orientation from ObjectFactory.get_orientations, current coords if None
+        :return: Relative coordinates
+        """
+        if orientation_id is None:
+            return piece.currentCoords
+        return GR.ObjectFactory.ObjectFactory.get_orientations(piece.currentCoords)[orientation_id].coords
 
-    def check_piece_fits(self, x: int, y: int, piece: GR.Structure.Piece) -> bool:
+    def check_piece_fits(self, x: int, y: int, piece: GR.Structure.Piece, orientation_id: int = None) -> bool:
         """
         Check if piece will fit at location
         True if fits
         :param x: x coord
         :param y: y coord
         :param piece: Piece to place
+        :param orientation_id: Optional orientation from ObjectFactory.get_orientations, current coords if None
         :return: bool
         """
-        placeable = False
-        for xy_pair in piece.currentCoords:
-            posx = xy_pair[0] + x
-            posy = xy_pair[1] + y
-            # check if position is on board
-            if not (0 <= posx < len(self.positions) and 0 <= posy < len(self.positions[0])):
-                return False
-            board_pos = self.positions[posx][posy]
-            if piece.color in board_pos.placeable_by:
-                placeable = True
-            if board_pos.color is not None:
-                return False
-            if self.check_adjacent_squares(posx, posy, piece.color):
-                return False
-        return placeable
+        mask = self.bitboard.shape_mask(self.get_piece_coords(piece, orientation_id), x, y)
+        return mask is not None and piece.color in self.bitboard.corners and self.bitboard.fits(mask, piece.color)
 
-    def update_placeable_lists(self, players: list[GR.Structure.Piece]):
+    def update_placeable_lists(self, players: list[Players.SimplePlayers.Player]):
         """
-        Update placeable lists for all location on the board
+        Update placeable lists for all location on the board from the bitboard corner masks
         :param players: Players to update
         """
-        for x in range(0, len(self.positions)):
-            for y in range(0, len(self.positions[0])):
-                if [x, y] not in self.starting_positions:
-                    self.positions[x][y].placeable_by = []
-                if self.positions[x][y].color is None:
-                    for player in players:
-                        if self.check_diagonal_squares(x, y, player.color) and not self.check_adjacent_squares(x, y, player.color):
-                            self.positions[x][y].placeable_by.append(player.color)
+        self.bitboard.update_masks([player.color for player in players])
+        for column in self.positions:
+            for pos in column:
+                pos.placeable_by = []
+        for player in players:
+            self.corner_index[player.color] = set(self.bitboard.iter_cells(self.bitboard.corners[player.color]))
+            for x, y in self.corner_index[player.color]:
+                self.positions[x][y].placeable_by.append(player.color)
 
-    def place_piece(self, x: int, y: int, piece: GR.Structure.Piece) -> bool:
+    def update_placeable_cells(self, mask: int):
+        """
+        Rebuild placeable lists and corner indexes for the cells in mask only
+        Gives the same lists as update_placeable_lists for those cells
+        :param mask: Bitboard mask of the cells to update
+        """
+        corners = self.bitboard.corners
+        for x, y in self.bitboard.iter_cells(mask):
+            cell = self.bitboard.cell_mask(x, y)
+            placeable_by = []
+            for color in self.player_colors:
+                if corners[color] & cell:
+                    placeable_by.append(color)
+                    self.corner_index[color].add((x, y))
+                else:
+                    self.corner_index[color].discard((x, y))
+            self.positions[x][y].placeable_by = placeable_by
+
+    def place_piece(self, x: int, y: int, piece: GR.Structure.Piece, orientation_id: int = None) -> bool:
         """
         Place a Piece on the board
+        Corner and forbidden state is updated around the placed cells, no full update is needed
         :param x: x coord
         :param y: ycoord
         :param piece: Piece to place
+        :param orientation_id: Optional orientation from ObjectFactory.get_orientations, current coords if None
         :return: bool
         """
-        if self.check_piece_fits(x, y, piece):
-            for xy_pair in piece.currentCoords:
-                pos = self.positions[xy_pair[0] + x][xy_pair[1] + y]
-                pos.color = piece.color
+        if self.check_piece_fits(x, y, piece, orientation_id):
+            self.fill_cells(x, y, self.get_piece_coords(piece, orientation_id), piece.color, piece.name)
             return True
         return False
 
+    def fill_cells(self, x: int, y: int, coords: list, color: str, name: str) -> int:
+        """
+        Fill the cells of an already checked placement and update the board state around them
+        The turn passes to the next player in player_colors
+        :param x: x coord
+        :param y: y coord
+        :param coords: Relative coordinates of the placed cells
+        :param color: Player color
+        :param name: Name of the placed piece
+        :return: Mask of the cells whose placeable lists changed
+        """
+        for xy_pair in coords:
+            pos = self.positions[xy_pair[0] + x][xy_pair[1] + y]
+            pos.color = color
+            self.zobrist_hash ^= self.zobrist_key('cell', xy_pair[0] + x, xy_pair[1] + y, color)
+        self.zobrist_hash ^= self.zobrist_key('piece', color, name)
+        self.placed_pieces[color].add(name)
+        self.set_player_to_move(self.player_colors[(self.player_colors.index(color) + 1) % len(self.player_colors)])
+        mask = self.bitboard.shape_mask(coords, x, y)
+        self.move_history.append((color, name, mask))
+        changed = self.bitboard.place(mask, color)
+        self.update_placeable_cells(changed)
+        self.invalidate_mobility(mask, color)
+        return changed
+
+    def apply_move(self, x: int, y: int, piece: GR.Structure.Piece, orientation_id: int = None) -> bool:
+        """
+        Place a Piece on the board so that it can be taken back with undo_move
+        Only the masks and the changed neighbourhood are recorded, the board is never copied
+        :param x: x coord
+        :param y: y coord
+        :param piece: Piece to place
+        :param orientation_id: Optional orientation from ObjectFactory.get_orientations, current coords if None
+        :return: bool
+        """
+        if not self.check_piece_fits(x, y, piece, orientation_id):
+            return False
+        bitboard = self.bitboard
+        coords = self.get_piece_coords(piece, orientation_id)
+        record = [x, y, coords, piece.color, piece.name, bitboard.occupied, bitboard.owned[piece.color],
+                  dict(bitboard.forbidden), dict(bitboard.corners), dict(self.mobility), dict(self.mobility_reach),
+                  self.zobrist_hash, self.to_move]
+        record.append(self.fill_cells(x, y, coords, piece.color, piece.name))
+        self.undo_stack.append(record)
+        return True
+
+    def undo_move(self):
+        """
+        Take back the last move made with apply_move
+        """
+        x, y, coords, color, name, occupied, owned, forbidden, corners, mobility, mobility_reach, zobrist_hash, \
+            to_move, changed = self.undo_stack.pop()
+        for xy_pair in coords:
+            self.positions[xy_pair[0] + x][xy_pair[1] + y].color = None
+        self.placed_pieces[color].discard(name)
+        self.move_history.pop()
+        self.bitboard.occupied = occupied
+        self.bitboard.owned[color] = owned
+        self.bitboard.forbidden = forbidden
+        self.bitboard.corners = corners
+        self.mobility = mobility
+        self.mobility_reach = mobility_reach
+        self.zobrist_hash = zobrist_hash
+        self.to_move = to_move
+        self.update_placeable_cells(changed)
+
     def get_printable_board(self, player: Players.SimplePlayers.Player = None) -> str:
         """
         Return a printable board
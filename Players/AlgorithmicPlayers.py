@@ -1,11 +1,12 @@
-import copy
 import csv
-import random
+import numpy as np
 import GameResources
 
 from termcolor import colored
-from Players.SimplePlayers import Player, Move
+from Players.SimplePlayers import Player, Move, PackedMove
 from GameResources.Structure import Piece, GameBoard
+from GameResources.MoveGenerator import MoveGenerator
+from Players.HeatmapRegistry import HeatmapRegistry
 from abc import abstractmethod
 from collections import defaultdict
 
@@ -14,24 +15,35 @@ class StaticHeatmapPlayer(Player):
     """
     Heuristic Player with a static heatmap.
     """
-    def __init__(self, color: str, default_heatmap: str = 'Players/heatmaps/blank.txt', initial_pieces: list[Piece] = None) -> None:
+    def __init__(self, color: str, default_heatmap: str | np.ndarray = 'Players/heatmaps/blank.txt', initial_pieces: list[Piece] = None) -> None:
         """
         Call super constructor, then initialise self.current_heatmap
-        :param default_heatmap:
+        :param default_heatmap: Heatmap file path, or a heatmap array indexed [x][y]
         """
         Player.__init__(self, color, initial_pieces if initial_pieces is not None else GameResources.ObjectFactory.ObjectFactory.generate_single_default_shape_set(color))
-        self.current_heatmap = self.load_txt_heatmap(default_heatmap)
-        self.heatmap_name = default_heatmap
+        self.current_heatmap = self.get_heatmap(default_heatmap)
+        self.heatmap_name = default_heatmap if isinstance(default_heatmap, str) else 'array'
 
     def __str__(self):
         return f'StaticHeatmapPlayer{{{super().__str__()}, heatmap: {self.heatmap_name}}}'
 
     @staticmethod
-    def load_txt_heatmap(filepath: str) -> list[list[int]]:
+    def get_heatmap(heatmap: str | np.ndarray) -> np.ndarray:
+        """
+        Get a heatmap from the registry, arrays are used as they are
+        :param heatmap: Heatmap file path or array
+        :return: Heatmap array indexed [x][y]
+        """
+        if isinstance(heatmap, str):
+            return HeatmapRegistry.get(heatmap, StaticHeatmapPlayer.load_txt_heatmap)
+        return heatmap
+
+    @staticmethod
+    def load_txt_heatmap(filepath: str) -> np.ndarray:
         """
         Load a heatmap from a text file.
         :param filepath: File path to load from
-        :return: None
+        :return: Heatmap array indexed [x][y]
         """
         read_file = open(filepath)
         raw_map = read_file.read()
@@ -39,22 +51,24 @@ class StaticHeatmapPlayer(Player):
         map_lines = raw_map.split('\n')
         parsed_heatmap = []
         for line in map_lines:
-            parsed_heatmap.append([int(char) for char in line])
-        return parsed_heatmap
+            if line:
+                parsed_heatmap.append([int(char) for char in line])
+        return np.array(parsed_heatmap, dtype=np.int64)
 
     @staticmethod
-    def load_csv_heatmap(filepath: str) -> list[list[int]]:
+    def load_csv_heatmap(filepath: str) -> np.ndarray:
         """
         Load a heatmap from a text file
         :param filepath: File path to load from
-        :return: None
+        :return: Heatmap array indexed [x][y]
         """
         parsed_heatmap = []
         with open(filepath) as csv_map:
             data = csv.reader(csv_map)
             for row in data:
-                parsed_heatmap.append([int(char) for char in row])
-        return parsed_heatmap
+                if row:
+                    parsed_heatmap.append([int(char) for char in row])
+        return np.array(parsed_heatmap, dtype=np.int64)
 
     def get_printable_heatmap(self, board: GameBoard) -> str:
         """
@@ -85,7 +99,7 @@ class StaticHeatmapPlayer(Player):
             ret += f'{col:02} '
         return ret
 
-    def get_all_moves(self, board: GameBoard, pieces: list[Piece] = None) -> list[Move]:
+    def get_all_moves(self, board: GameBoard, pieces: list[Piece] = None) -> list[PackedMove]:
         """
         Return all possible moves on the current game-board.
         :param board: The current game-board
@@ -93,47 +107,66 @@ class StaticHeatmapPlayer(Player):
         :return: All possible moves
         """
         selected_pieces = pieces if pieces is not None else self.pieces
-        placeables = self.get_placeables(board)
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, self.color, selected_pieces)
+        hand_indexes = [self.pieces.index(piece) for piece in selected_pieces] if pieces is not None else None
         moves = []
-        if placeables:
-            for piece in selected_pieces:
-                selected_piece = copy.deepcopy(piece)
-                for rotation in range(4):
-                    selected_piece.rotate()
-                    for flip in range(2):
-                        selected_piece.flip()
-                        for location in placeables:
-                            if board.check_piece_fits(location[0],
-                                                      location[1],
-                                                      selected_piece):
-                                moves.append(Move(copy.deepcopy(selected_piece), self.pieces.index(piece), location))
+        for piece_id, orientation_id, x, y in zip(piece_ids.tolist(), orientation_ids.tolist(), xs.tolist(), ys.tolist()):
+            piece_index = hand_indexes[piece_id] if hand_indexes is not None else piece_id
+            moves.append(PackedMove(piece_index, orientation_id, (x, y)))
         return moves
 
-    def score_move(self, move: Move) -> int:
+    def score_move(self, move: Move | PackedMove) -> int:
         """
         Score an individual move by adding up the heatmap values covered by the piece.
         :param move: The move to be scored
         :return: The move score
         """
+        coords = move.get_orientation(self.pieces).coords if isinstance(move, PackedMove) else move.piece.currentCoords
         score = 0
-        for coord in move.piece.currentCoords:
+        for coord in coords:
             score += self.current_heatmap[move.position[0] + coord[0]][move.position[1] + coord[1]]
         return score
 
-    def score_all_moves(self, board: GameBoard, moves: list[Move] = None) -> defaultdict[int, list[Move]]:
+    def score_move_arrays(self,
+                          piece_ids: np.ndarray,
+                          orientation_ids: np.ndarray,
+                          xs: np.ndarray,
+                          ys: np.ndarray,
+                          pieces: list[Piece] = None) -> np.ndarray:
+        """
+        Score a batch of moves from MoveGenerator.generate_moves with one gather and sum over the heatmap.
+        :param piece_ids: Piece of each move
+        :param orientation_ids: Orientation of each move
+        :param xs: x offset of each move
+        :param ys: y offset of each move
+        :param pieces: Pieces the piece_ids index, self.pieces by default
+        :return: Score of each move
+        """
+        if len(xs) == 0:
+            return np.zeros(0, dtype=np.int64)
+        cell_xs, cell_ys, valid = MoveGenerator.get_cells(pieces if pieces is not None else self.pieces,
+                                                          piece_ids, orientation_ids, xs, ys)
+        return (np.asarray(self.current_heatmap)[cell_xs, cell_ys] * valid).sum(axis=1)
+
+    def score_all_moves(self, board: GameBoard, moves: list[Move | PackedMove] = None) -> defaultdict[int, list[Move | PackedMove]]:
         """
         Score a set of moves.
         :param board: The game board
-        :param moves: self.get_all_moves() be default, can be used to provide a culled set of moves
+        :param moves: All moves by default, can be used to provide a culled set of moves
         :return: Dict | Scores => Move List
         """
-        selected_moves = moves if moves is not None else self.get_all_moves(board)
         move_scores = defaultdict(list)
-        for move in selected_moves:
-            move_scores[self.score_move(move)].append(move)
+        if moves is not None:
+            for move in moves:
+                move_scores[self.score_move(move)].append(move)
+            return move_scores
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, self.color, self.pieces)
+        scores = self.score_move_arrays(piece_ids, orientation_ids, xs, ys)
+        for i, score in enumerate(scores.tolist()):
+            move_scores[score].append(PackedMove(int(piece_ids[i]), int(orientation_ids[i]), (int(xs[i]), int(ys[i]))))
         return move_scores
 
-    def select_move(self, board: GameBoard) -> Move | None:
+    def select_move(self, board: GameBoard) -> Move | PackedMove | None:
         """
         Score all possible moves then select the best.
         :param board: Current game-board
@@ -141,24 +174,24 @@ class StaticHeatmapPlayer(Player):
         """
         placeables = self.get_placeables(board)
         if placeables and not self.has_knocked:
-            move_scores = self.score_all_moves(board)
-            if len(move_scores.keys()) > 0:
-                best_score = max(move_scores.keys())
-                best_moves = move_scores[best_score]
+            piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, self.color, self.pieces)
+            if len(xs) > 0:
+                scores = self.score_move_arrays(piece_ids, orientation_ids, xs, ys)
+                best_moves = [PackedMove(int(piece_ids[i]), int(orientation_ids[i]), (int(xs[i]), int(ys[i])))
+                              for i in np.flatnonzero(scores == scores.max())]
                 if len(best_moves) == 1:
                     return best_moves[0]
-                elif len(best_moves) > 1:
-                    return self.tiebreak_moves(best_moves)
+                return self.tiebreak_moves(best_moves)
             self.has_knocked = True
         return None
 
-    def tiebreak_moves(self, moves: list[Move]) -> Move:
+    def tiebreak_moves(self, moves: list[Move | PackedMove]) -> Move | PackedMove:
         """
         Default tiebreak function, return a random move.
         :param moves: Moves to tie-break
         :return: A single chosen move
         """
-        return random.choice(moves)
+        return self.rng.choice(moves)
 
 
 class DynamicHeatmapPlayer(StaticHeatmapPlayer):
@@ -177,7 +210,7 @@ class DynamicHeatmapPlayer(StaticHeatmapPlayer):
         """
         pass
 
-    def select_move(self, board: GameBoard) -> Move | None:
+    def select_move(self, board: GameBoard) -> Move | PackedMove | None:
         """
         Update the heatmap, then select a move.
         :param board:
@@ -191,15 +224,7 @@ class DynamicHeatmapPlayer(StaticHeatmapPlayer):
         Get min and max values in heatmap.
         :return: tuple[min, max]
         """
-        min_heat = 999
-        max_heat = -999
-        for x in range(len(self.current_heatmap)):
-            for y in range(len(self.current_heatmap[0])):
-                if self.current_heatmap[x][y] < min_heat:
-                    min_heat = self.current_heatmap[x][y]
-                if self.current_heatmap[x][y] > max_heat:
-                    max_heat = self.current_heatmap[x][y]
-        return min_heat, max_heat
+        return self.current_heatmap.min(), self.current_heatmap.max()
 
     def increment_heatmap(self, amount: int = 1) -> None:
         """
@@ -207,9 +232,7 @@ class DynamicHeatmapPlayer(StaticHeatmapPlayer):
         :param amount: How much to increment
         :return: None
         """
-        for x in range(len(self.current_heatmap)):
-            for y in range(len(self.current_heatmap[0])):
-                self.current_heatmap[x][y] += amount
+        self.current_heatmap = self.current_heatmap + amount
 
     def multiply_heatmap(self, mul: int = 1) -> None:
         """
@@ -217,11 +240,26 @@ class DynamicHeatmapPlayer(StaticHeatmapPlayer):
         :param mul: multiplier
         :return: None
         """
-        for x in range(len(self.current_heatmap)):
-            for y in range(len(self.current_heatmap[0])):
-                self.current_heatmap[x][y] *= mul
+        self.current_heatmap = self.current_heatmap * mul
 
-    def tiebreak_moves(self, moves: list[Move]) -> Move:
+    @staticmethod
+    def get_board_layers(board: GameBoard) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get per-color layers of the board as boolean arrays of shape (colors, x, y), in board.player_colors order.
+        :param board: Current game-board
+        :return: tuple[owned, adjacent, corners], adjacent is True where a cell borders a cell owned by that color
+        """
+        bitboard = board.bitboard
+        owned = np.stack([bitboard.to_array(bitboard.owned[color]) for color in board.player_colors])
+        corners = np.stack([bitboard.to_array(bitboard.corners[color]) for color in board.player_colors])
+        adjacent = np.zeros_like(owned)
+        adjacent[:, 1:, :] |= owned[:, :-1, :]
+        adjacent[:, :-1, :] |= owned[:, 1:, :]
+        adjacent[:, :, 1:] |= owned[:, :, :-1]
+        adjacent[:, :, :-1] |= owned[:, :, 1:]
+        return owned, adjacent, corners
+
+    def tiebreak_moves(self, moves: list[Move | PackedMove]) -> Move | PackedMove:
         """
         Return one of the moves containing the "largest piece"
         :param moves: Moves to tie-break
@@ -232,33 +270,35 @@ class DynamicHeatmapPlayer(StaticHeatmapPlayer):
         for move in moves:
             if move.piece_index == max_index:
                 culled_moves.append(move)
-        return random.choice(culled_moves)
+        return self.rng.choice(culled_moves)
 
 
 class HeatmapSwitcher(DynamicHeatmapPlayer):
-    def __init__(self, color: str, heatmaps: dict[int, str] = None):
+    def __init__(self, color: str, heatmaps: dict[int, str | np.ndarray] = None):
         """
         Call super constructor, load the heatmaps, initialise the current heatmap.
-        Heatmaps should be provided in a dict {threshold: filename}, in ascending order of threshold.
+        Heatmaps should be provided in a dict {threshold: filename or array}, in ascending order of threshold.
         :param heatmaps:
         """
         DynamicHeatmapPlayer.__init__(self, color)
         self.heatmaps = heatmaps if heatmaps is not None else {15: 'Players/heatmaps/new_aggressive_x.txt', 20:  'Players/heatmaps/sidewinder.txt'}
-        self.current_heatmap = self.load_txt_heatmap(self.heatmaps[list(self.heatmaps.keys())[0]])
+        # threshold => heatmap array, resolved once so switching never goes back to the registry
+        self.loaded_heatmaps = {threshold: self.get_heatmap(heatmap) for threshold, heatmap in self.heatmaps.items()}
+        self.current_heatmap = self.loaded_heatmaps[list(self.heatmaps.keys())[0]]
 
     def __str__(self):
         return f'HeatmapSwitcher{{{super().__str__()}, heatmaps: {self.heatmaps}}}'
 
     def update_heatmap(self, board: GameBoard) -> None:
         """
-        Load the current heatmap, then return.
+        Switch to the current heatmap, then return.
         The loaded heatmap is the first one in self.heatmaps with threshold <= self.turn_count
         :param board:
         :return: None
         """
         for threshold in self.heatmaps.keys():
             if self.turn_count <= threshold:
-                self.current_heatmap = self.load_txt_heatmap(self.heatmaps[threshold])
+                self.current_heatmap = self.loaded_heatmaps[threshold]
                 return
 
 
@@ -281,16 +321,13 @@ class AggressiveDynamic(HeatmapSwitcher):
         :return: None
         """
         HeatmapSwitcher.update_heatmap(self, board)
-        for x in range(len(board.positions)):
-            for y in range(len(board.positions[0])):
-                for player in board.player_colors:
-                    if board.check_adjacent_squares(x, y, player):
-                        if player == self.color:
-                            self.current_heatmap[x][y] = 0
-                        else:
-                            self.current_heatmap[x][y] += self.adjacent_weight
-                    elif player in board.positions[x][y].placeable_by and player != self.color:
-                        self.current_heatmap[x][y] += self.placeable_weight
+        owned, adjacent, corners = self.get_board_layers(board)
+        layers = self.adjacent_weight * adjacent + self.placeable_weight * (corners & ~adjacent)
+        own = board.player_colors.index(self.color)
+        # Cells bordering our own pieces are reset to 0 part way through the colors, so only later colors count there
+        self.current_heatmap = np.where(adjacent[own],
+                                        layers[own + 1:].sum(axis=0),
+                                        self.current_heatmap + layers.sum(axis=0) - layers[own])
         # print(self.get_printable_heatmap(board))
 
 
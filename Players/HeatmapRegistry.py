@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import os
+import numpy as np
+
+from collections import OrderedDict
+from typing import Callable
+
+
+class HeatmapRegistry:
+    """
+    Process-wide cache of parsed heatmaps.
+    Entries are keyed by path, mtime and size, so a heatmap file rewritten while the process runs is loaded again on
+    the next get. Every get costs one os.stat, players resolve their heatmaps once when they are built rather than every
+    move. The least recently used entry is dropped once the cache is full. Cached arrays are read-only, players replace
+    their heatmap rather than editing it in place.
+    """
+    MAX_ENTRIES = 64
+    # (path, mtime, size) => read-only heatmap array
+    CACHE = OrderedDict()
+
+    @staticmethod
+    def get(filepath: str, loader: Callable[[str], np.ndarray]) -> np.ndarray:
+        """
+        Get a heatmap, loading it on a cache miss
+        :param filepath: File path of the heatmap
+        :param loader: Function to parse the file on a miss
+        :return: Read-only heatmap array
+        """
+        stat = os.stat(filepath)
+        key = (filepath, stat.st_mtime_ns, stat.st_size)
+        heatmap = HeatmapRegistry.CACHE.get(key)
+        if heatmap is not None:
+            HeatmapRegistry.CACHE.move_to_end(key)
+            return heatmap
+        heatmap = np.asarray(loader(filepath))
+        heatmap.flags.writeable = False
+        HeatmapRegistry.CACHE[key] = heatmap
+        while len(HeatmapRegistry.CACHE) > HeatmapRegistry.MAX_ENTRIES:
+            HeatmapRegistry.CACHE.popitem(last=False)
+        return heatmap
+
+    @staticmethod
+    def clear() -> None:
+        """
+        Drop all cached heatmaps
+        :return: None
+        """
+        HeatmapRegistry.CACHE.clear()
@@ -1,41 +1,158 @@
+import numpy as np
+
 from abc import abstractmethod
 from dataclasses import dataclass
 
-from Players.SimplePlayers import Player
+from Players.SimplePlayers import Player, PackedMove
 from GameResources.Structure import Piece, GameBoard
-from SimplePlayers import Move
+from GameResources.MoveGenerator import MoveGenerator
 
 
 @dataclass
 class BoardState:
-    # Array of weights for each board position
-    weights: list[list[int]]
-    colors: list[list[str]]
+    """
+    Tensor encoding of one or more game states, from the point of view of the player to move.
+    Players are ordered from the player to move onwards in turn order.
+    """
+    # (..., players * 2, x, y), occupancy then corner plane for each player
+    planes: np.ndarray
+    # (..., players, pieces), True where the piece is still in the player's hand
+    pieces: np.ndarray
 
 
 class MachineLearningPlayer(Player):
     """
     An abstract class for machine learning players
+    Every candidate move is encoded into a batch of resulting states which are scored with a single model call.
     """
     def __init__(self, color: str, initial_pieces: list[Piece], initial_state):
         Player.__init__(self, color, initial_pieces)
         self.initial_state = initial_state
+        # Column of each piece name in BoardState.pieces
+        self.piece_columns = {piece.name: column for column, piece in enumerate(initial_pieces)}
 
-    def get_possible_moves(self, board: GameBoard) -> list[Move]:
-        return []
+    def get_possible_moves(self, board: GameBoard) -> list[PackedMove]:
+        """
+        Get every legal move
+        :param board: The current game-board
+        :return: All possible moves
+        """
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, self.color, self.pieces)
+        return [PackedMove(piece_id, orientation_id, (x, y)) for piece_id, orientation_id, x, y in
+                zip(piece_ids.tolist(), orientation_ids.tolist(), xs.tolist(), ys.tolist())]
 
-    @abstractmethod
-    def combine_state_board(self, board) -> BoardState:
-        return BoardState([[0]], [['None']])
+    def get_turn_order(self, board: GameBoard) -> list[str]:
+        """
+        :param board: The current game-board
+        :return: Player colors starting with this player
+        """
+        colors = board.player_colors
+        start = colors.index(self.color)
+        return colors[start:] + colors[:start]
+
+    def combine_state_board(self, board: GameBoard) -> BoardState:
+        """
+        Encode the current board
+        :param board: The current game-board
+        :return: State of shape (players * 2, x, y) and (players, pieces)
+        """
+        bitboard = board.bitboard
+        colors = self.get_turn_order(board)
+        planes = np.zeros((len(colors) * 2, bitboard.width, bitboard.height), dtype=np.float32)
+        pieces = np.zeros((len(colors), len(self.piece_columns)), dtype=bool)
+        for i, color in enumerate(colors):
+            planes[2 * i] = bitboard.to_array(bitboard.owned[color])
+            planes[2 * i + 1] = bitboard.to_array(bitboard.corners[color])
+            for piece in (self.pieces if color == self.color else board.get_hand(color)):
+                if piece.name in self.piece_columns:
+                    pieces[i, self.piece_columns[piece.name]] = True
+        return BoardState(planes, pieces)
+
+    def encode_moves(self,
+                     board: GameBoard,
+                     piece_ids: np.ndarray,
+                     orientation_ids: np.ndarray,
+                     xs: np.ndarray,
+                     ys: np.ndarray) -> BoardState:
+        """
+        Encode the state after each move, without making any of them on the board
+        :param board: The current game-board
+        :param piece_ids: Piece of each move, indexes self.pieces
+        :param orientation_ids: Orientation of each move
+        :param xs: x offset of each move
+        :param ys: y offset of each move
+        :return: States of shape (moves, players * 2, x, y) and (moves, players, pieces)
+        """
+        state = self.combine_state_board(board)
+        count = len(xs)
+        _, width, height = state.planes.shape
+        placed = np.zeros((count, width, height), dtype=bool)
+        if count:
+            cell_xs, cell_ys, valid = MoveGenerator.get_cells(self.pieces, piece_ids, orientation_ids, xs, ys)
+            rows = np.broadcast_to(np.arange(count)[:, None], valid.shape)
+            placed[rows[valid], cell_xs[valid], cell_ys[valid]] = True
+        adjacent = np.zeros_like(placed)
+        adjacent[:, 1:, :] |= placed[:, :-1, :]
+        adjacent[:, :-1, :] |= placed[:, 1:, :]
+        adjacent[:, :, 1:] |= placed[:, :, :-1]
+        adjacent[:, :, :-1] |= placed[:, :, 1:]
+        diagonal = np.zeros_like(placed)
+        diagonal[:, 1:, 1:] |= placed[:, :-1, :-1]
+        diagonal[:, :-1, :-1] |= placed[:, 1:, 1:]
+        diagonal[:, 1:, :-1] |= placed[:, :-1, 1:]
+        diagonal[:, :-1, 1:] |= placed[:, 1:, :-1]
+        bitboard = board.bitboard
+        forbidden = bitboard.to_array(bitboard.forbidden[self.color])
+        planes = np.repeat(state.planes[None], count, axis=0)
+        planes[:, 0] = np.logical_or(planes[:, 0], placed)
+        planes[:, 1] = (np.logical_or(planes[:, 1], diagonal)) & ~(forbidden | placed | adjacent)
+        planes[:, 3::2] *= ~placed[:, None]
+        pieces = np.repeat(state.pieces[None], count, axis=0)
+        columns = np.array([self.piece_columns.get(piece.name, -1) for piece in self.pieces], dtype=np.int64)
+        if count:
+            moved = columns[piece_ids]
+            known = moved >= 0
+            pieces[np.flatnonzero(known), 0, moved[known]] = False
+        return BoardState(planes, pieces)
 
     @abstractmethod
     def mutate_state(self):
         return None
 
     @abstractmethod
-    def score_moves(self, moves: list[Move]) -> dict[Move, int]:
-        return {}
+    def score_states(self, states: BoardState) -> np.ndarray:
+        """
+        Score a batch of states with one model call
+        :param states: States of shape (moves, ...)
+        :return: Score of each state, higher is better
+        """
+        return np.zeros(len(states.planes))
 
-    @abstractmethod
-    def select_move(self, moves: list[Move]) -> Move | None:
-        return None
+    def score_moves(self, board: GameBoard, moves: list[PackedMove]) -> np.ndarray:
+        """
+        Score moves by the state they lead to
+        :param board: The current game-board
+        :param moves: Moves to score
+        :return: Score of each move, in the order of moves
+        """
+        piece_ids = np.array([move.piece_index for move in moves], dtype=np.int64)
+        orientation_ids = np.array([move.orientation_id for move in moves], dtype=np.int64)
+        xs = np.array([move.position[0] for move in moves], dtype=np.int64)
+        ys = np.array([move.position[1] for move in moves], dtype=np.int64)
+        return self.score_states(self.encode_moves(board, piece_ids, orientation_ids, xs, ys))
+
+    def select_move(self, board: GameBoard) -> PackedMove | None:
+        """
+        Encode every legal move, score them in one batch and pick the best
+        :param board: The current game-board
+        :return: Selected Move, None if there are no moves
+        """
+        if self.has_knocked:
+            return None
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, self.color, self.pieces)
+        if len(xs) == 0:
+            self.has_knocked = True
+            return None
+        scores = self.score_states(self.encode_moves(board, piece_ids, orientation_ids, xs, ys))
+        best = int(np.argmax(scores))
+        return PackedMove(int(piece_ids[best]), int(orientation_ids[best]), (int(xs[best]), int(ys[best])))
@@ -0,0 +1,672 @@
+from __future__ import annotations
+
+import math
+import numpy as np
+import GameResources
+
+from timeit import default_timer as timer
+from Players.SimplePlayers import Player, PackedMove
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer
+from GameResources.Structure import Piece, GameBoard
+from GameResources.BitBoard import BitBoard
+from GameResources.MoveGenerator import MoveGenerator
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time limit runs out
+    """
+    pass
+
+
+class SearchNode:
+    """
+    A position in a search tree, reached from its parent by self.move
+    """
+    __slots__ = ('move', 'parent', 'turn', 'passes', 'children', 'untried', 'visits', 'rewards')
+
+    def __init__(self, move: PackedMove | None, parent: SearchNode | None, turn: int, passes: int, player_count: int):
+        """
+        :param move: Move from the parent, None for the root or a pass
+        :param parent: Parent node, None for the root
+        :param turn: Index in board.player_colors of the player to move
+        :param passes: Number of passes in a row leading to this node
+        :param player_count: Number of players
+        """
+        self.move = move
+        self.parent = parent
+        self.turn = turn
+        self.passes = passes
+        self.children = []
+        # Moves not yet expanded, generated on the first visit
+        self.untried = None
+        self.visits = 0
+        # Summed playout rewards for each player
+        self.rewards = [0.0] * player_count
+
+
+class MCTSPlayer(Player):
+    """
+    Monte Carlo Tree Search player.
+    The tree is searched on the real board with apply_move/undo_move, playouts run on copies of the bitboard masks
+    placing a uniformly random legal placement of the largest piece that fits.
+    """
+    def __init__(self,
+                 color: str,
+                 time_limit: float | None = 1.0,
+                 max_playouts: int | None = None,
+                 exploration: float = 1.4,
+                 verbose: bool = False,
+                 initial_pieces: list[Piece] = None) -> None:
+        """
+        :param color: Player color
+        :param time_limit: Seconds to search per move, None for no limit
+        :param max_playouts: Playouts per move, None for no limit, at least one of the limits must be set
+        :param exploration: UCT exploration constant
+        :param verbose: Print the playout rate after every search
+        :param initial_pieces: Initial pieces, the default shape set if None
+        """
+        if time_limit is None and max_playouts is None:
+            raise ValueError('MCTSPlayer needs a time_limit or max_playouts, the search would never end')
+        Player.__init__(self, color, initial_pieces if initial_pieces is not None else GameResources.ObjectFactory.ObjectFactory.generate_single_default_shape_set(color))
+        self.time_limit = time_limit
+        self.max_playouts = max_playouts
+        self.exploration = exploration
+        self.verbose = verbose
+        self.total_playouts = 0
+        self.total_search_time = 0.0
+        # (playouts, seconds) of the last search
+        self.last_search = (0, 0.0)
+        # (piece, stride, height) => (size, [(mask, cell offsets, legal origins), ...]) for playouts
+        self.rollout_shapes = {}
+        # Playout tables and buffers, rebuilt by prepare_rollouts at the start of each search and reused by every
+        # playout. For each player: piece name => hand bit, and [(size, [(hand bit, orientations), ...]), ...] with
+        # the largest pieces first
+        self.rollout_bits = []
+        self.rollout_groups = []
+        self.rollout_hands = []
+        self.rollout_forbidden = []
+        self.rollout_corners = []
+        self.rollout_squares = []
+        self.rollout_bonus = []
+        self.rollout_active = []
+        self.rollout_rewards = []
+        # Mask and legal origins of each orientation of the piece being placed
+        self.rollout_masks = []
+        self.rollout_candidates = []
+
+    def __str__(self):
+        return f'MCTSPlayer{{{super().__str__()}, time_limit: {self.time_limit}, max_playouts: {self.max_playouts}}}'
+
+    def get_playout_rate(self) -> float:
+        """
+        Playouts per second over every search so far
+        :return: float
+        """
+        return self.total_playouts / self.total_search_time if self.total_search_time > 0 else 0.0
+
+    def select_move(self, board: GameBoard) -> PackedMove | None:
+        """
+        Search from the current position until the budget runs out, then pick the most visited move.
+        :param board: Current game-board
+        :return: Selected Move, None if there are no moves
+        """
+        if self.has_knocked:
+            return None
+        colors = board.player_colors
+        hands = [list(self.pieces) if color == self.color else board.get_hand(color) for color in colors]
+        root = SearchNode(None, None, colors.index(self.color), 0, len(colors))
+        root.untried = self.get_moves(board, hands, root)
+        if root.untried == [None]:
+            self.has_knocked = True
+            return None
+        if len(root.untried) == 1:
+            return root.untried[0]
+        self.prepare_rollouts(board)
+        start = timer()
+        playouts = 0
+        while playouts == 0 or ((self.max_playouts is None or playouts < self.max_playouts) and
+                                (self.time_limit is None or timer() - start < self.time_limit)):
+            self.run_playout(board, hands, root)
+            playouts += 1
+        elapsed = timer() - start
+        self.last_search = (playouts, elapsed)
+        self.total_playouts += playouts
+        self.total_search_time += elapsed
+        if self.verbose:
+            print(f'{self.color}: {playouts} playouts in {elapsed:.2f}s ({playouts / elapsed:.0f}/s)')
+        return max(root.children, key=lambda child: child.visits).move
+
+    def get_moves(self, board: GameBoard, hands: list[list[Piece]], node: SearchNode) -> list[PackedMove | None]:
+        """
+        Get the moves available at a node
+        :param board: Board in the node's position
+        :param hands: Hands of every player in the node's position
+        :param node: Node to expand
+        :return: Legal moves, [None] if the player must pass, [] if the game is over
+        """
+        if node.passes >= len(hands):
+            return []
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, board.player_colors[node.turn],
+                                                                          hands[node.turn])
+        if len(xs) == 0:
+            return [None]
+        return [PackedMove(piece_id, orientation_id, (x, y)) for piece_id, orientation_id, x, y in
+                zip(piece_ids.tolist(), orientation_ids.tolist(), xs.tolist(), ys.tolist())]
+
+    def run_playout(self, board: GameBoard, hands: list[list[Piece]], root: SearchNode) -> None:
+        """
+        Select a leaf by UCT, expand one move, play out to the end of the game and back up the result.
+        The board and hands are restored before returning.
+        :param board: Board in the root position
+        :param hands: Hands of every player in the root position
+        :param root: Root of the tree
+        :return: None
+        """
+        applied = []
+        node = root
+        while not node.untried and node.children:
+            node = self.select_child(node)
+            self.apply_node_move(board, hands, node, applied)
+        if node.untried is None:
+            node.untried = self.get_moves(board, hands, node)
+        if node.untried:
+            untried = node.untried
+            i = self.rng.randrange(len(untried))
+            untried[i], untried[-1] = untried[-1], untried[i]
+            move = untried.pop()
+            child = SearchNode(move, node, (node.turn + 1) % len(hands), node.passes + 1 if move is None else 0,
+                               len(hands))
+            node.children.append(child)
+            node = child
+            self.apply_node_move(board, hands, node, applied)
+        rewards = self.rollout(board.bitboard, board.player_colors, hands, node.turn)
+        for turn, piece_index, piece in reversed(applied):
+            board.undo_move()
+            hands[turn].insert(piece_index, piece)
+        player_count = len(rewards)
+        while node is not None:
+            node.visits += 1
+            node_rewards = node.rewards
+            for i in range(player_count):
+                node_rewards[i] += rewards[i]
+            node = node.parent
+
+    def select_child(self, node: SearchNode) -> SearchNode:
+        """
+        Pick the child with the best UCT value for the player to move at node
+        :param node: Fully expanded node
+        :return: Child node
+        """
+        log_visits = math.log(node.visits)
+        turn = node.turn
+        exploration = self.exploration
+        return max(node.children, key=lambda child: child.rewards[turn] / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+    @staticmethod
+    def apply_node_move(board: GameBoard, hands: list[list[Piece]], node: SearchNode, applied: list) -> None:
+        """
+        Make the move leading to node on the board and in the hands
+        :param board: Board in the parent's position
+        :param hands: Hands in the parent's position
+        :param node: Node to move to
+        :param applied: Moves made so far, the move is appended as (turn, piece index, piece)
+        :return: None
+        """
+        move = node.move
+        if move is None:
+            return
+        turn = node.parent.turn
+        piece = hands[turn][move.piece_index]
+        board.apply_move(move.position[0], move.position[1], piece, move.orientation_id)
+        del hands[turn][move.piece_index]
+        applied.append((turn, move.piece_index, piece))
+
+    def get_rollout_shapes(self, piece: Piece, bitboard: BitBoard) -> tuple[int, list]:
+        """
+        Get the placement masks of every orientation of a piece for playouts
+        :param piece: Piece to look up
+        :param bitboard: Bitboard the masks are for
+        :return: (size, [(mask at origin, cell bit offsets, mask of origins that keep the shape on the board), ...])
+        """
+        # Rotating a piece doesn't change its set of orientations, so the piece itself is a safe key
+        key = (piece, bitboard.stride, bitboard.height)
+        shapes = self.rollout_shapes.get(key)
+        if shapes is None:
+            orientations = GameResources.ObjectFactory.ObjectFactory.get_orientations(piece.currentCoords)
+            entries = []
+            for orientation in orientations:
+                offsets = tuple(dy * bitboard.stride + dx for dx, dy in orientation.coords)
+                mask = 0
+                for offset in offsets:
+                    mask |= 1 << offset
+                origins = 0
+                for y in range(bitboard.height - orientation.height + 1):
+                    for x in range(bitboard.width - orientation.width + 1):
+                        origins |= bitboard.cell_mask(x, y)
+                entries.append((mask, offsets, origins))
+            shapes = (len(orientations[0].coords), entries)
+            self.rollout_shapes[key] = shapes
+        return shapes
+
+    def prepare_rollouts(self, board: GameBoard) -> None:
+        """
+        Build the playout tables for every player's starting hand and size the playout buffers, so a playout only
+        updates ints in place and allocates no containers
+        :param board: Board the search runs on
+        :return: None
+        """
+        bitboard = board.bitboard
+        player_count = len(board.player_colors)
+        self.rollout_bits = []
+        self.rollout_groups = []
+        most = 0
+        for color in board.player_colors:
+            bits = {}
+            groups = {}
+            for i, piece in enumerate(board.initial_hands[color]):
+                bits[piece.name] = 1 << i
+                size, orientations = self.get_rollout_shapes(piece, bitboard)
+                groups.setdefault(size, []).append((1 << i, orientations))
+                most = max(most, len(orientations))
+            self.rollout_bits.append(bits)
+            self.rollout_groups.append(sorted(groups.items(), reverse=True))
+        self.rollout_masks = [0] * most
+        self.rollout_candidates = [0] * most
+        self.rollout_hands = [0] * player_count
+        self.rollout_forbidden = [0] * player_count
+        self.rollout_corners = [0] * player_count
+        self.rollout_squares = [0] * player_count
+        self.rollout_bonus = [0] * player_count
+        self.rollout_active = [True] * player_count
+        self.rollout_rewards = [0.0] * player_count
+
+    def rollout(self, bitboard: BitBoard, colors: list[str], hands: list[list[Piece]], turn: int) -> list[float]:
+        """
+        Play random moves on copies of the bitboard masks until no player can move.
+        Each player places the largest piece that fits, pieces of one size are tried from a random starting point, at
+        a uniformly random legal spot. Hands are bitmasks over the starting hand and all state lives in the buffers
+        set up by prepare_rollouts.
+        :param bitboard: Bitboard in the position to play out from
+        :param colors: Player colors in turn order
+        :param hands: Hands of every player
+        :param turn: Index of the player to move
+        :return: Reward for each player, 1 shared between the winners, valid until the next playout
+        """
+        player_count = len(colors)
+        rng = self.rng
+        forbidden = self.rollout_forbidden
+        corners = self.rollout_corners
+        hand_masks = self.rollout_hands
+        squares = self.rollout_squares
+        bonus = self.rollout_bonus
+        active = self.rollout_active
+        rollout_masks = self.rollout_masks
+        rollout_candidates = self.rollout_candidates
+        for i in range(player_count):
+            forbidden[i] = bitboard.forbidden[colors[i]]
+            corners[i] = bitboard.corners[colors[i]]
+            bits = self.rollout_bits[i]
+            hand_mask = 0
+            hand_squares = 0
+            for piece in hands[i]:
+                hand_mask |= bits[piece.name]
+                hand_squares += piece.size
+            hand_masks[i] = hand_mask
+            squares[i] = hand_squares
+            bonus[i] = 0
+            active[i] = True
+        stuck = 0
+        while stuck < player_count:
+            if not active[turn]:
+                stuck += 1
+                turn = (turn + 1) % player_count
+                continue
+            own_forbidden = forbidden[turn]
+            own_corners = corners[turn]
+            hand_mask = hand_masks[turn]
+            placed = 0
+            if own_corners:
+                for size, members in self.rollout_groups[turn]:
+                    count = len(members)
+                    first = rng.randrange(count) if count > 1 else 0
+                    for k in range(count):
+                        bit, orientations = members[(first + k) % count]
+                        if not hand_mask & bit:
+                            continue
+                        total = 0
+                        legal = 0
+                        for mask, offsets, origins in orientations:
+                            touching = 0
+                            blocked = 0
+                            for offset in offsets:
+                                touching |= own_corners >> offset
+                                blocked |= own_forbidden >> offset
+                            candidates = touching & ~blocked & origins
+                            if candidates:
+                                total += candidates.bit_count()
+                                rollout_masks[legal] = mask
+                                rollout_candidates[legal] = candidates
+                                legal += 1
+                        if not total:
+                            continue
+                        choice = rng.randrange(total)
+                        for j in range(legal):
+                            candidates = rollout_candidates[j]
+                            spots = candidates.bit_count()
+                            if choice < spots:
+                                for _ in range(choice):
+                                    candidates &= candidates - 1
+                                placed = rollout_masks[j] << ((candidates & -candidates).bit_length() - 1)
+                                break
+                            choice -= spots
+                        hand_masks[turn] = hand_mask & ~bit
+                        squares[turn] -= size
+                        if not hand_masks[turn]:
+                            bonus[turn] = 20 if size == 1 else 15
+                        break
+                    if placed:
+                        break
+            if not placed:
+                active[turn] = False
+                stuck += 1
+            else:
+                stuck = 0
+                own_forbidden |= placed | bitboard.adjacent(placed)
+                forbidden[turn] = own_forbidden
+                corners[turn] = (own_corners | bitboard.diagonal(placed)) & ~own_forbidden
+                for other in range(player_count):
+                    if other != turn:
+                        forbidden[other] |= placed
+                        corners[other] &= ~placed
+            turn = (turn + 1) % player_count
+        best = -1 << 30
+        winners = 0
+        for i in range(player_count):
+            points = bonus[i] - squares[i]
+            if points > best:
+                best = points
+                winners = 1
+            elif points == best:
+                winners += 1
+        rewards = self.rollout_rewards
+        for i in range(player_count):
+            rewards[i] = 1.0 / winners if bonus[i] - squares[i] == best else 0.0
+        return rewards
+
+
+class ParanoidPlayer(StaticHeatmapPlayer):
+    """
+    Paranoid alpha-beta search player, every opponent is assumed to play to minimise this player's evaluation.
+    Searches with iterative deepening until the time limit or max depth, moves are ordered by heatmap score and the
+    best move found for each position is kept in a transposition table keyed by the board's Zobrist hash and the number
+    of passes in a row.
+    With time_limit None the search is deterministic.
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self,
+                 color: str,
+                 default_heatmap: str = 'Players/heatmaps/sidewinder.txt',
+                 time_limit: float | None = 1.0,
+                 max_depth: int = 4,
+                 max_branching: int | None = 12,
+                 square_weight: float = 1.0,
+                 mobility_weight: float = 0.25,
+                 heatmap_weight: float = 0.1,
+                 verbose: bool = False,
+                 initial_pieces: list[Piece] = None) -> None:
+        """
+        :param color: Player color
+        :param default_heatmap: Heatmap used to order moves and in the evaluation
+        :param time_limit: Seconds to search per move, None to always search to max_depth
+        :param max_depth: Deepest iteration in plies
+        :param max_branching: Moves searched at each node after ordering, None for all
+        :param square_weight: Evaluation weight of squares placed
+        :param mobility_weight: Evaluation weight of corner anchors
+        :param heatmap_weight: Evaluation weight of the heatmap value under this player's pieces
+        :param verbose: Print the search depth and node rate after every search
+        :param initial_pieces: Initial pieces, the default shape set if None
+        """
+        StaticHeatmapPlayer.__init__(self, color, default_heatmap, initial_pieces)
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.max_branching = max_branching
+        self.square_weight = square_weight
+        self.mobility_weight = mobility_weight
+        self.heatmap_weight = heatmap_weight
+        self.verbose = verbose
+        # Zobrist hash mixed with the passes in a row => (depth, value, flag, best move), cleared every turn
+        self.transpositions = {}
+        self.root_turn = 0
+        self.deadline = None
+        self.nodes = 0
+        self.total_nodes = 0
+        self.total_search_time = 0.0
+        # (depth completed, nodes, seconds) of the last search
+        self.last_search = (0, 0, 0.0)
+
+    def __str__(self):
+        return f'ParanoidPlayer{{{super().__str__()}, time_limit: {self.time_limit}, max_depth: {self.max_depth}, ' \
+               f'max_branching: {self.max_branching}}}'
+
+    def get_node_rate(self) -> float:
+        """
+        Nodes searched per second over every search so far
+        :return: float
+        """
+        return self.total_nodes / self.total_search_time if self.total_search_time > 0 else 0.0
+
+    def select_move(self, board: GameBoard) -> PackedMove | None:
+        """
+        Search deeper until the time limit or max depth is reached, then play the best move of the last full iteration.
+        :param board: Current game-board
+        :return: Selected Move, None if there are no moves
+        """
+        if self.has_knocked:
+            return None
+        colors = board.player_colors
+        hands = [list(self.pieces) if color == self.color else board.get_hand(color) for color in colors]
+        self.root_turn = colors.index(self.color)
+        moves = self.get_ordered_moves(board, hands, self.root_turn)
+        if not moves:
+            self.has_knocked = True
+            return None
+        if len(moves) == 1:
+            return moves[0]
+        self.transpositions = {}
+        self.nodes = 0
+        start = timer()
+        self.deadline = start + self.time_limit if self.time_limit is not None else None
+        best_move = moves[0]
+        depth_completed = 0
+        try:
+            for depth in range(1, self.max_depth + 1):
+                best_move = self.search_root(board, hands, moves, depth)
+                depth_completed = depth
+                # Search the previous best move first on the next iteration
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+        except SearchTimeout:
+            pass
+        elapsed = timer() - start
+        self.last_search = (depth_completed, self.nodes, elapsed)
+        self.total_nodes += self.nodes
+        self.total_search_time += elapsed
+        if self.verbose:
+            print(f'{self.color}: depth {depth_completed}, {self.nodes} nodes in {elapsed:.2f}s '
+                  f'({self.nodes / elapsed:.0f}/s)')
+        return best_move
+
+    def search_root(self, board: GameBoard, hands: list[list[Piece]], moves: list[PackedMove], depth: int) -> PackedMove:
+        """
+        Search every root move to depth
+        :param board: Current game-board
+        :param hands: Hands of every player
+        :param moves: Ordered root moves
+        :param depth: Depth in plies
+        :return: Best move
+        """
+        alpha = -math.inf
+        best_move = moves[0]
+        for move in moves:
+            value = self.search_move(board, hands, move, self.root_turn, depth, alpha, math.inf)
+            if value > alpha:
+                alpha = value
+                best_move = move
+        return best_move
+
+    def search_move(self,
+                    board: GameBoard,
+                    hands: list[list[Piece]],
+                    move: PackedMove,
+                    turn: int,
+                    depth: int,
+                    alpha: float,
+                    beta: float) -> float:
+        """
+        Make a move, search the position after it, then take it back
+        :param board: Current game-board
+        :param hands: Hands of every player
+        :param move: Move to make
+        :param turn: Index of the player making the move
+        :param depth: Remaining depth including this move
+        :param alpha: Alpha bound
+        :param beta: Beta bound
+        :return: Value of the position after the move
+        """
+        piece = hands[turn][move.piece_index]
+        board.apply_move(move.position[0], move.position[1], piece, move.orientation_id)
+        del hands[turn][move.piece_index]
+        try:
+            return self.search(board, hands, (turn + 1) % len(hands), depth - 1, alpha, beta, 0)
+        finally:
+            board.undo_move()
+            hands[turn].insert(move.piece_index, piece)
+
+    def search(self,
+               board: GameBoard,
+               hands: list[list[Piece]],
+               turn: int,
+               depth: int,
+               alpha: float,
+               beta: float,
+               passes: int) -> float:
+        """
+        Paranoid alpha-beta search, this player maximises and every other player minimises
+        :param board: Current game-board
+        :param hands: Hands of every player
+        :param turn: Index of the player to move
+        :param depth: Remaining depth in plies, passes don't use up depth
+        :param alpha: Alpha bound
+        :param beta: Beta bound
+        :param passes: Number of passes in a row leading here
+        :return: Value of the position for this player
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 255 and timer() > self.deadline:
+            raise SearchTimeout()
+        if depth == 0 or passes >= len(hands):
+            return self.evaluate(board, hands)
+        # Passes in a row decide when the game ends, so the same position with pending passes is a different entry
+        key = board.state_hash() ^ board.zobrist_key('passes', passes) if passes else board.state_hash()
+        entry = self.transpositions.get(key)
+        hint = None
+        if entry is not None:
+            entry_depth, value, flag, hint = entry
+            if entry_depth >= depth:
+                if flag == ParanoidPlayer.EXACT:
+                    return value
+                if flag == ParanoidPlayer.LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+        moves = self.get_ordered_moves(board, hands, turn, hint)
+        if not moves:
+            board.set_player_to_move(board.player_colors[(turn + 1) % len(hands)])
+            try:
+                return self.search(board, hands, (turn + 1) % len(hands), depth, alpha, beta, passes + 1)
+            finally:
+                board.set_player_to_move(board.player_colors[turn])
+        original_alpha, original_beta = alpha, beta
+        maximising = turn == self.root_turn
+        best_value = -math.inf if maximising else math.inf
+        best_move = None
+        for move in moves:
+            value = self.search_move(board, hands, move, turn, depth, alpha, beta)
+            if maximising:
+                if value > best_value:
+                    best_value, best_move = value, move
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best_move = value, move
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        if best_value <= original_alpha:
+            flag = ParanoidPlayer.UPPER
+        elif best_value >= original_beta:
+            flag = ParanoidPlayer.LOWER
+        else:
+            flag = ParanoidPlayer.EXACT
+        self.transpositions[key] = (depth, best_value, flag, best_move)
+        return best_value
+
+    def get_ordered_moves(self,
+                          board: GameBoard,
+                          hands: list[list[Piece]],
+                          turn: int,
+                          hint: PackedMove = None) -> list[PackedMove]:
+        """
+        Get the legal moves of a player, best heatmap score first then largest piece, cut to self.max_branching
+        :param board: Current game-board
+        :param hands: Hands of every player
+        :param turn: Index of the player to move
+        :param hint: Best move from the transposition table, searched first
+        :return: Ordered moves
+        """
+        hand = hands[turn]
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, board.player_colors[turn], hand)
+        if len(xs) == 0:
+            return []
+        scores = self.score_move_arrays(piece_ids, orientation_ids, xs, ys, hand)
+        sizes = np.array([piece.size for piece in hand])[piece_ids]
+        order = np.lexsort((-sizes, -scores))
+        if self.max_branching is not None:
+            order = order[:self.max_branching]
+        moves = [PackedMove(int(piece_ids[i]), int(orientation_ids[i]), (int(xs[i]), int(ys[i]))) for i in order]
+        if hint is not None:
+            if hint in moves:
+                moves.remove(hint)
+            moves.insert(0, hint)
+        return moves
+
+    def evaluate(self, board: GameBoard, hands: list[list[Piece]]) -> float:
+        """
+        Evaluate a position for this player.
+        Squares placed and corner anchors are counted relative to the opponents' average, plus the heatmap value of
+        the cells this player covers.
+        :param board: Current game-board
+        :param hands: Hands of every player
+        :return: Evaluation, higher is better for this player
+        """
+        bitboard = board.bitboard
+        squares = [bitboard.owned[color].bit_count() for color in board.player_colors]
+        mobility = [bitboard.corners[color].bit_count() for color in board.player_colors]
+        opponents = len(squares) - 1
+        own_squares = squares[self.root_turn]
+        own_mobility = mobility[self.root_turn]
+        value = self.square_weight * own_squares + self.mobility_weight * own_mobility
+        if opponents:
+            value -= self.square_weight * (sum(squares) - own_squares) / opponents
+            value -= self.mobility_weight * (sum(mobility) - own_mobility) / opponents
+        if self.heatmap_weight:
+            owned = bitboard.to_array(bitboard.owned[self.color])
+            value += self.heatmap_weight * float(self.current_heatmap[owned].sum())
+        return value
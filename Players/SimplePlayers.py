@@ -4,9 +4,11 @@ import random
 import re
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import NamedTuple
 
+import GameResources
 from termcolor2 import colored
-from GameResources.Structure import Piece, GameBoard
+from GameResources.Structure import Piece, GameBoard, Orientation
 
 # TODO Player Ideas
 # Sorted pieces random position
@@ -24,6 +26,33 @@ class Move:
     position: tuple[int, int]
 
 
+class PackedMove(NamedTuple):
+    """
+    A compact move, the placed cells are resolved through the shared orientation table instead of a copied Piece.
+    """
+    piece_index: int
+    orientation_id: int
+    position: tuple[int, int]
+
+    def get_orientation(self, pieces: list[Piece]) -> Orientation:
+        """
+        Resolve the orientation of the moved piece
+        :param pieces: The hand the move was made from
+        :return: The orientation to place
+        """
+        return GameResources.ObjectFactory.ObjectFactory.get_orientations(pieces[self.piece_index].currentCoords)[self.orientation_id]
+
+    def to_move(self, pieces: list[Piece]) -> Move:
+        """
+        Wrap the move in a Move with its own oriented Piece
+        :param pieces: The hand the move was made from
+        :return: Equivalent Move
+        """
+        piece = pieces[self.piece_index]
+        coords = [list(coord) for coord in self.get_orientation(pieces).coords]
+        return Move(Piece(piece.name, coords, piece.color), self.piece_index, self.position)
+
+
 class Player(ABC):
     """
     Abstract class to represent a generic player
@@ -41,6 +70,12 @@ class Player(ABC):
         # self. final piece is used to detect if the final piece placed was the "one" piece, this grants 5 bonus points
         self.final_piece = None
         self.turn_count = 0
+        # (piece index, piece, final piece) for each move made with apply_move
+        self.undo_stack = []
+        # Optional GameResources.OpeningBook.OpeningBook consulted for the first turns
+        self.opening_book = None
+        # Source of every random choice the player makes, Tetros replaces it with the game's generator
+        self.rng = random.Random(random.getrandbits(64))
 
     def __str__(self):
         """
@@ -93,14 +128,9 @@ class Player(ABC):
         :param board: The gamebaord
         :return: All placeable locations on the board
         """
-        placeables = []
-        for y in range(0, len(board.positions[0])):
-            for x in range(0, len(board.positions)):
-                if self.color in board.positions[x][y].placeable_by:
-                    placeables.append((x, y))
-        return placeables
+        return board.get_corners(self.color)
 
-    def place_piece(self, board: GameBoard, move: Move) -> bool:
+    def place_piece(self, board: GameBoard, move: Move | PackedMove) -> bool:
         """
         Place a piece
         :param move: The move to make
@@ -108,25 +138,85 @@ class Player(ABC):
         :return: Was the piece placed?
         """
         x, y = move.position
-        if board.place_piece(x, y, move.piece):
+        piece, orientation_id = self.resolve_move(move)
+        if board.place_piece(x, y, piece, orientation_id):
             if len(self.pieces) == 1:
-                self.final_piece = move.piece
+                self.final_piece = piece
             self.pieces.remove(self.pieces[move.piece_index])
             return True
         return False
 
+    def resolve_move(self, move: Move | PackedMove) -> tuple[Piece, int | None]:
+        """
+        Get the piece and orientation a move places
+        :param move: The move to resolve
+        :return: (piece, orientation_id), orientation_id is None when the piece's own coords are used
+        """
+        if isinstance(move, PackedMove):
+            return self.pieces[move.piece_index], move.orientation_id
+        return move.piece, None
+
+    def apply_move(self, board: GameBoard, move: Move | PackedMove) -> bool:
+        """
+        Make a move that can be taken back with undo_move, for searching ahead
+        :param board: The board to place the piece on
+        :param move: The move to make
+        :return: Was the piece placed?
+        """
+        x, y = move.position
+        piece, orientation_id = self.resolve_move(move)
+        if board.apply_move(x, y, piece, orientation_id):
+            self.undo_stack.append((move.piece_index, self.pieces[move.piece_index], self.final_piece))
+            if len(self.pieces) == 1:
+                self.final_piece = piece
+            del self.pieces[move.piece_index]
+            return True
+        return False
+
+    def undo_move(self, board: GameBoard):
+        """
+        Take back the last move made with apply_move, on the board and in the hand
+        :param board: The board the move was made on
+        """
+        board.undo_move()
+        piece_index, piece, final_piece = self.undo_stack.pop()
+        self.pieces.insert(piece_index, piece)
+        self.final_piece = final_piece
+
     def take_turn(self, board: GameBoard) -> bool:
         """
         Select then place a piece if possible
         :param board: The gameboard to analyse
         @:returns True if piece was placed
         """
-        move = self.select_move(board)
+        move = self.get_book_move(board)
+        if move is None:
+            if self.opening_book is not None and self.opening_book.learning and \
+                    self.turn_count < self.opening_book.turns:
+                move = self.opening_book.teach(board, self)
+            else:
+                move = self.select_move(board)
         if move is not None and self.place_piece(board, move):
             self.turn_count += 1
             return True
         return False
 
+    def get_book_move(self, board: GameBoard) -> PackedMove | None:
+        """
+        Look the position up in the opening book
+        :param board: The gameboard to analyse
+        :return: The book move if the book covers this turn and has a legal move for the position, else None
+        """
+        if self.opening_book is None or self.opening_book.learning or self.turn_count >= self.opening_book.turns:
+            return None
+        move = self.opening_book.lookup(board)
+        if move is None or move.piece_index >= len(self.pieces):
+            return None
+        if not board.check_piece_fits(move.position[0], move.position[1], self.pieces[move.piece_index],
+                                      move.orientation_id):
+            return None
+        return move
+
     def out_of_pieces(self) -> bool:
         """
         Is hand empty
@@ -142,11 +232,11 @@ class Player(ABC):
         """
         count = 0
         for piece in self.pieces:
-            count += len(piece.currentCoords)
+            count += piece.size
         return count
 
     @abstractmethod
-    def select_move(self, board: GameBoard) -> Move | None:
+    def select_move(self, board: GameBoard) -> Move | PackedMove | None:
         """
         Abstract method for selecting a piece all subclasses must implement
         If a piece cannot be placed return none
@@ -188,13 +278,13 @@ class HumanPlayer(Player):
         command = input(command_input_string).lower()
         while re.search('[0-9]+,[0-9]+', command) is None and command != 'k':
             if command == 'r':
-                selected_piece.rotate()
+                selected_piece = selected_piece.rotate()
             if re.search('r[0-9]+', command) is not None:
                 command = command.strip('r')
                 for i in range(int(command) % 4):
-                    selected_piece.rotate()
+                    selected_piece = selected_piece.rotate()
             if command == 'f':
-                selected_piece.flip()
+                selected_piece = selected_piece.flip()
             print(board.get_printable_board(self))
             print('Selected Piece:')
             print(selected_piece.get_printable_shape())
@@ -222,18 +312,18 @@ class RandomPlayer(Player):
         placeable_locations = self.get_placeables(board)
         if not placeable_locations:
             return None
-        selected_location = random.choice(placeable_locations)
-        selected_index = random.randint(0, len(self.pieces) - 1)
+        selected_location = self.rng.choice(placeable_locations)
+        selected_index = self.rng.randint(0, len(self.pieces) - 1)
         selected_piece = self.pieces[selected_index]
-        if random.random() < 0.5:
-            selected_piece.flip()
-        rand = random.random()
+        if self.rng.random() < 0.5:
+            selected_piece = selected_piece.flip()
+        rand = self.rng.random()
         if rand < 0.25:
-            selected_piece.rotate()
+            selected_piece = selected_piece.rotate()
         if rand < 0.5:
-            selected_piece.rotate()
+            selected_piece = selected_piece.rotate()
         if rand < 0.75:
-            selected_piece.rotate()
+            selected_piece = selected_piece.rotate()
         if not board.check_piece_fits(selected_location[0], selected_location[1], selected_piece):
             self.timeout += 1
             if self.timeout > 21:
@@ -249,36 +339,44 @@ class ExhaustiveRandomPlayer(RandomPlayer):
         RandomPlayer.__init__(self, color, initial_pieces)
         self.exhausted = False
 
-    def select_move(self, board: GameBoard) -> Move | None:
+    def iter_legal_moves(self, board: GameBoard):
         """
-        Use Random player algorithm until self.has_knocked
-        :param board:
-        :return:
+        Lazily generate legal moves in random order
+        Pieces, orientations, corners and the cell of the piece placed on the corner are each shuffled, so only as many
+        placements are checked as it takes to find the next legal one
+        :param board: The gameboard to analyse
+        :return: Generator of PackedMove, a placement touching several corners may be generated more than once
         """
-        super_result = RandomPlayer.select_move(self, board)
-        if self.has_knocked:
-            placeables = self.get_placeables(board)
-            if placeables and not self.exhausted:
-                for piece in self.pieces:
-                    for location in placeables:
-                        for y_offset in range(-1, 1):
-                            for x_offset in range(-1, 1):
-                                randomised_rotations = [0, 1, 2, 3]
-                                random.shuffle(randomised_rotations)
-                                for rotation in randomised_rotations:
-                                    randomised_flips = [True, False]
-                                    random.shuffle(randomised_flips)
-                                    for flip in randomised_flips:
-                                        selected_piece = copy.deepcopy(piece)
-                                        for i in range(0, rotation):
-                                            selected_piece.rotate()
-                                        if flip:
-                                            piece.flip()
-                                        if board.check_piece_fits(location[0] + x_offset,
-                                                                  location[1] + y_offset,
-                                                                  selected_piece):
-                                            self.has_knocked = False
-                                            return Move(selected_piece, self.pieces.index(piece), location)
-            self.exhausted = True
+        corners = self.get_placeables(board)
+        if not corners:
+            return
+        self.rng.shuffle(corners)
+        bitboard = board.bitboard
+        piece_indexes = list(range(len(self.pieces)))
+        self.rng.shuffle(piece_indexes)
+        for piece_index in piece_indexes:
+            orientations = list(enumerate(GameResources.ObjectFactory.ObjectFactory.get_orientations(self.pieces[piece_index].currentCoords)))
+            self.rng.shuffle(orientations)
+            for orientation_id, orientation in orientations:
+                anchors = list(orientation.coords)
+                for corner_x, corner_y in corners:
+                    self.rng.shuffle(anchors)
+                    for anchor_x, anchor_y in anchors:
+                        x, y = corner_x - anchor_x, corner_y - anchor_y
+                        mask = bitboard.shape_mask(orientation.coords, x, y)
+                        if mask is not None and bitboard.fits(mask, self.color):
+                            yield PackedMove(piece_index, orientation_id, (x, y))
+
+    def select_move(self, board: GameBoard) -> PackedMove | None:
+        """
+        Take the first move from a random ordering of the legal moves, knock once there are none
+        :param board: The gameboard to analyse
+        :return: Selected Move, None if there are no moves
+        """
+        if self.exhausted:
             return None
-        return super_result
+        move = next(self.iter_legal_moves(board), None)
+        if move is None:
+            self.has_knocked = True
+            self.exhausted = True
+        return move
@@ -0,0 +1,293 @@
+import numpy as np
+
+from GameResources.ObjectFactory import ObjectFactory
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer
+from Players.SimplePlayers import Player, ExhaustiveRandomPlayer
+
+
+class BatchEngine:
+    """
+    Plays many independent games in lockstep.
+    Every game is a slice of struct-of-arrays NumPy tensors, each ply finds and scores the legal moves of the player to
+    move in every game at once, so the per-move Python overhead is paid once per batch instead of once per game.
+    Supports StaticHeatmapPlayer (best heatmap score, random tiebreak) and ExhaustiveRandomPlayer (first fit of a
+    shuffled piece, orientation and corner order), players with other move selection can't be batched.
+    """
+    def __init__(self,
+                 players: list[Player],
+                 board_size: tuple[int, int] = (20, 20),
+                 starting_positions: list[[int, int]] = None,
+                 no_games: int = 256,
+                 seed: int = None):
+        """
+        :param players: Players in every game, turn order and starting positions are shuffled for each game
+        :param board_size: Size of the board (x,y)
+        :param starting_positions: Starting positions, the board corners if None
+        :param no_games: Number of games in the batch
+        :param seed: Seed for shuffling and tiebreaks
+        """
+        for player in players:
+            if not BatchEngine.supports(player):
+                raise ValueError(f'{type(player).__name__} can\'t be played by the batch engine')
+        self.players = players
+        self.width, self.height = board_size
+        self.starting_positions = starting_positions if starting_positions is not None else \
+            [[0, 0], [0, self.height - 1], [self.width - 1, 0], [self.width - 1, self.height - 1]]
+        self.no_games = no_games
+        self.rng = np.random.default_rng(seed)
+        self.pieces = list(players[0].pieces)
+        self.piece_sizes = np.array([piece.size for piece in self.pieces])
+        columns = {piece.name: column for column, piece in enumerate(self.pieces)}
+        # Every orientation of every piece, as (piece column, coords, width, height)
+        self.orientations = []
+        for column, piece in enumerate(self.pieces):
+            for orientation in ObjectFactory.get_orientations(piece.currentCoords):
+                self.orientations.append((column, orientation.coords, orientation.width, orientation.height))
+        self.orientation_columns = np.array([column for column, _, _, _ in self.orientations], dtype=np.int64)
+        self.random_players = np.array([type(player) is ExhaustiveRandomPlayer for player in players])
+        cells = max(len(coords) for _, coords, _, _ in self.orientations)
+        self.cell_dx = np.zeros((len(self.orientations), cells), dtype=np.int64)
+        self.cell_dy = np.zeros((len(self.orientations), cells), dtype=np.int64)
+        self.cell_valid = np.zeros((len(self.orientations), cells), dtype=bool)
+        for i, (_, coords, _, _) in enumerate(self.orientations):
+            self.cell_dx[i, :len(coords)] = [coord[0] for coord in coords]
+            self.cell_dy[i, :len(coords)] = [coord[1] for coord in coords]
+            self.cell_valid[i, :len(coords)] = True
+        # Heatmap score of every orientation at every origin for each player, unused for random players
+        heatmaps = np.zeros((len(players), self.width, self.height))
+        for p, player in enumerate(players):
+            if isinstance(player, StaticHeatmapPlayer):
+                heatmaps[p] = player.current_heatmap
+        self.orientation_scores = []
+        for _, coords, width, height in self.orientations:
+            span_x, span_y = self.width - width + 1, self.height - height + 1
+            scores = np.zeros((len(players), max(span_x, 0), max(span_y, 0)))
+            for dx, dy in coords:
+                scores += heatmaps[:, dx:dx + span_x, dy:dy + span_y]
+            self.orientation_scores.append(scores)
+        games, player_count = no_games, len(players)
+        self.owned = np.zeros((games, player_count, self.width, self.height), dtype=bool)
+        self.forbidden = np.zeros((games, player_count, self.width, self.height), dtype=bool)
+        self.corners = np.zeros((games, player_count, self.width, self.height), dtype=bool)
+        self.hands = np.zeros((games, player_count, len(self.pieces)), dtype=bool)
+        for p, player in enumerate(players):
+            for piece in player.pieces:
+                self.hands[:, p, columns[piece.name]] = True
+        self.active = np.ones((games, player_count), dtype=bool)
+        self.live = np.ones(games, dtype=bool)
+        self.turn_counts = np.zeros((games, player_count), dtype=np.int64)
+        self.last_piece_sizes = np.zeros((games, player_count), dtype=np.int64)
+        # Turn order of each game, as indexes into players
+        self.order = np.argsort(self.rng.random((games, player_count)), axis=1)
+        for game in range(games):
+            starts = self.rng.permutation(len(self.starting_positions))
+            for turn, p in enumerate(self.order[game]):
+                x, y = self.starting_positions[starts[turn]]
+                self.corners[game, p, x, y] = True
+
+    @staticmethod
+    def supports(player: Player) -> bool:
+        """
+        Only the exact classes the engine implements are supported, subclasses may select moves differently
+        :param player: Player to check
+        :return: Can the batch engine play the player's move selection?
+        """
+        return type(player) in (StaticHeatmapPlayer, ExhaustiveRandomPlayer) and player.opening_book is None
+
+    def play(self) -> list[dict[str, dict[str, float]]]:
+        """
+        Play every game to the end
+        :return: Scores of each game, in the format of Tetros.calculate_player_scores
+        """
+        player_count = len(self.players)
+        while self.live.any():
+            for turn in range(player_count):
+                self.play_ply(self.order[:, turn])
+            out_of_pieces = ~self.hands.any(axis=2)
+            self.live &= self.active.any(axis=1) & ~out_of_pieces.any(axis=1)
+        return self.calculate_scores()
+
+    def play_ply(self, movers: np.ndarray):
+        """
+        Find, score and make the move of the player to move in every live game
+        :param movers: Index of the player to move in each game
+        """
+        games = np.arange(self.no_games)
+        can_move = self.live & self.active[games, movers]
+        playing = np.flatnonzero(can_move)
+        if not len(playing):
+            return
+        random_movers = self.random_players[movers[playing]]
+        chosen = [self.select_heatmap_moves(playing[~random_movers], movers),
+                  self.select_random_moves(playing[random_movers], movers)]
+        moved_games, orientations, xs, ys = (np.concatenate(part) for part in zip(*chosen))
+        moved = np.zeros(self.no_games, dtype=bool)
+        moved[moved_games] = True
+        # Players with no legal move can never place again
+        self.active[games[can_move & ~moved], movers[can_move & ~moved]] = False
+        if not len(moved_games):
+            return
+        moved_movers = movers[moved_games]
+        placed = np.zeros((len(moved_games), self.width, self.height), dtype=bool)
+        valid = self.cell_valid[orientations]
+        rows = np.broadcast_to(np.arange(len(moved_games))[:, None], valid.shape)
+        placed[rows[valid], (xs[:, None] + self.cell_dx[orientations])[valid],
+               (ys[:, None] + self.cell_dy[orientations])[valid]] = True
+        adjacent = np.zeros_like(placed)
+        adjacent[:, 1:, :] |= placed[:, :-1, :]
+        adjacent[:, :-1, :] |= placed[:, 1:, :]
+        adjacent[:, :, 1:] |= placed[:, :, :-1]
+        adjacent[:, :, :-1] |= placed[:, :, 1:]
+        diagonal = np.zeros_like(placed)
+        diagonal[:, 1:, 1:] |= placed[:, :-1, :-1]
+        diagonal[:, :-1, :-1] |= placed[:, 1:, 1:]
+        diagonal[:, 1:, :-1] |= placed[:, :-1, 1:]
+        diagonal[:, :-1, 1:] |= placed[:, 1:, :-1]
+        self.owned[moved_games, moved_movers] |= placed
+        self.forbidden[moved_games] |= placed[:, None]
+        self.corners[moved_games] &= ~placed[:, None]
+        own_forbidden = self.forbidden[moved_games, moved_movers] | adjacent
+        self.forbidden[moved_games, moved_movers] = own_forbidden
+        self.corners[moved_games, moved_movers] = (self.corners[moved_games, moved_movers] | diagonal) & ~own_forbidden
+        pieces = self.orientation_columns[orientations]
+        self.hands[moved_games, moved_movers, pieces] = False
+        self.last_piece_sizes[moved_games, moved_movers] = self.piece_sizes[pieces]
+        self.turn_counts[moved_games, moved_movers] += 1
+
+    def iter_legal_origins(self, forbidden: np.ndarray, corners: np.ndarray, hands: np.ndarray):
+        """
+        Find the legal origins of every orientation in every game
+        :param forbidden: Forbidden masks of the players to move, shape (games, x, y)
+        :param corners: Corner masks of the players to move, shape (games, x, y)
+        :param hands: Hands of the players to move, shape (games, pieces)
+        :return: Generator of (orientation index, legal origins of shape (games, span_x, span_y)), for the orientations
+        with a legal origin in any game
+        """
+        for o, (column, coords, width, height) in enumerate(self.orientations):
+            span_x, span_y = self.width - width + 1, self.height - height + 1
+            in_hand = hands[:, column]
+            if span_x <= 0 or span_y <= 0 or not in_hand.any():
+                continue
+            touching = np.zeros((len(hands), span_x, span_y), dtype=bool)
+            for dx, dy in coords:
+                touching |= corners[:, dx:dx + span_x, dy:dy + span_y]
+            touching &= in_hand[:, None, None]
+            if not touching.any():
+                continue
+            blocked = np.zeros_like(touching)
+            for dx, dy in coords:
+                blocked |= forbidden[:, dx:dx + span_x, dy:dy + span_y]
+            legal = touching & ~blocked
+            if legal.any():
+                yield o, legal
+
+    def select_heatmap_moves(self, games: np.ndarray, movers: np.ndarray) -> tuple[np.ndarray, ...]:
+        """
+        Pick the best heatmap move in each game, ties are broken uniformly at random like StaticHeatmapPlayer
+        :param games: Games whose player to move is a heatmap player
+        :param movers: Index of the player to move in each game of the batch
+        :return: (game, orientation, x, y) of each game that has a legal move
+        """
+        game_movers = movers[games]
+        # Every legal move of every game, as (index in games, orientation, x, y, heatmap score)
+        candidates = [[], [], [], [], []]
+        for o, legal in self.iter_legal_origins(self.forbidden[games, game_movers], self.corners[games, game_movers],
+                                                self.hands[games, game_movers]):
+            legal_games, legal_xs, legal_ys = np.nonzero(legal)
+            candidates[0].append(legal_games)
+            candidates[1].append(np.full(len(legal_games), o))
+            candidates[2].append(legal_xs)
+            candidates[3].append(legal_ys)
+            candidates[4].append(self.orientation_scores[o][game_movers[legal_games], legal_xs, legal_ys])
+        if not candidates[0]:
+            return (np.zeros(0, dtype=np.int64),) * 4
+        legal_games, legal_orientations, legal_xs, legal_ys, scores = (np.concatenate(part) for part in candidates)
+        # Scores are whole numbers, noise below 1 breaks ties uniformly at random
+        scores = scores + self.rng.random(len(scores))
+        order = np.lexsort((scores, legal_games))
+        sorted_games = legal_games[order]
+        best = order[np.flatnonzero(np.append(sorted_games[1:] != sorted_games[:-1], True))]
+        return games[legal_games[best]], legal_orientations[best], legal_xs[best], legal_ys[best]
+
+    def select_random_moves(self, games: np.ndarray, movers: np.ndarray) -> tuple[np.ndarray, ...]:
+        """
+        Pick a random move in each game the way ExhaustiveRandomPlayer.iter_legal_moves does. Pieces, orientations and
+        corners are tried in a random order, and the first fit is placed with a random cell of the piece on the corner.
+        Each shuffle is a random key per item, the sequential player finds the first piece with a legal move, then the
+        first of its orientations with one, then the legal (corner, cell) placement of it with the smallest keys.
+        :param games: Games whose player to move is a random player
+        :param movers: Index of the player to move in each game of the batch
+        :return: (game, orientation, x, y) of each game that has a legal move
+        """
+        game_movers = movers[games]
+        corners = self.corners[games, game_movers]
+        legal_origins = dict(self.iter_legal_origins(self.forbidden[games, game_movers], corners,
+                                                     self.hands[games, game_movers]))
+        if not legal_origins:
+            return (np.zeros(0, dtype=np.int64),) * 4
+        orientations = np.array(list(legal_origins))
+        has_legal = np.stack([legal_origins[o].any(axis=(1, 2)) for o in orientations], axis=1)
+        # Rank of each piece in the game's piece order, the fraction orders the piece's orientations
+        piece_ranks = np.argsort(np.argsort(self.rng.random((len(games), len(self.pieces))), axis=1), axis=1)
+        keys = piece_ranks[:, self.orientation_columns[orientations]] + self.rng.random(has_legal.shape)
+        keys[~has_legal] = np.inf
+        chosen = np.argmin(keys, axis=1)
+        moving = has_legal.any(axis=1)
+        corner_keys = self.rng.random((len(games), self.width, self.height))
+        # Every placement of the chosen orientations, as (index in games, orientation, x, y, corner key), once for
+        # each cell of the piece placed on a corner
+        candidates = [[], [], [], [], []]
+        for i in np.unique(chosen[moving]):
+            o = orientations[i]
+            subset = np.flatnonzero(moving & (chosen == i))
+            legal = legal_origins[o][subset]
+            _, coords, width, height = self.orientations[o]
+            span_x, span_y = self.width - width + 1, self.height - height + 1
+            for dx, dy in coords:
+                legal_games, legal_xs, legal_ys = np.nonzero(corners[subset, dx:dx + span_x, dy:dy + span_y] & legal)
+                legal_games = subset[legal_games]
+                candidates[0].append(legal_games)
+                candidates[1].append(np.full(len(legal_games), o))
+                candidates[2].append(legal_xs)
+                candidates[3].append(legal_ys)
+                candidates[4].append(corner_keys[legal_games, legal_xs + dx, legal_ys + dy])
+        legal_games, legal_orientations, legal_xs, legal_ys, corner_order = (np.concatenate(part) for part in candidates)
+        order = np.lexsort((self.rng.random(len(legal_games)), corner_order, legal_games))
+        sorted_games = legal_games[order]
+        first = order[np.flatnonzero(np.append(True, sorted_games[1:] != sorted_games[:-1]))]
+        return games[legal_games[first]], legal_orientations[first], legal_xs[first], legal_ys[first]
+
+    def calculate_scores(self) -> list[dict[str, dict[str, float]]]:
+        """
+        Score every game, matching Tetros.calculate_player_scores
+        :return: Scores of each game, sorted by points
+        """
+        squares_left = (self.hands * self.piece_sizes).sum(axis=2)
+        occupied = self.owned.any(axis=1)
+        results = []
+        for game in range(self.no_games):
+            scores = {}
+            for p in self.order[game]:
+                xs, ys = np.nonzero(self.owned[game, p])
+                if len(xs):
+                    minx, miny, maxx, maxy = xs.min(), ys.min(), xs.max(), ys.max()
+                else:
+                    minx, miny, maxx, maxy = self.width, self.height, 0, 0
+                filled = occupied[game, minx:maxx, miny:maxy].sum() if maxx > minx and maxy > miny else 0
+                points = -int(squares_left[game, p])
+                if squares_left[game, p] == 0:
+                    points += 20 if self.last_piece_sizes[game, p] == 1 else 15
+                scores[self.players[p].color] = {
+                    'Coverage': round(float((maxx - minx) * (maxy - miny) / (self.width * self.height)) * 100, 2),
+                    'Density': round(float(filled / (self.width * self.width)) * 100, 2),
+                    'Territory': 0,
+                    'Squares Left': int(squares_left[game, p]),
+                    'Points': points,
+                    'Win': 0,
+                    'Active Turns': int(self.turn_counts[game, p])
+                }
+            best = max(score['Points'] for score in scores.values())
+            for score in scores.values():
+                score['Win'] = 1 if score['Points'] == best else 0
+            results.append(dict(sorted(scores.items(), key=lambda item: item[1]['Points'], reverse=True)))
+        return results
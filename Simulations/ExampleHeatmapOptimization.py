@@ -0,0 +1,11 @@
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer
+from Simulations.HeatmapOptimizer import HeatmapOptimizer
+
+if __name__ == '__main__':
+    opponents = [StaticHeatmapPlayer('blue', 'Players/heatmaps/sidewinder.txt'),
+        StaticHeatmapPlayer('green', 'Players/heatmaps/bullseye.txt'),
+        StaticHeatmapPlayer('yellow', 'Players/heatmaps/aggressiveX.txt')]
+    optimizer = HeatmapOptimizer(opponents, ['Players/heatmaps/sidewinder.txt', 'Players/heatmaps/bullseye.txt',
+                                             'Players/heatmaps/reverse_bullseye.txt', 'Players/heatmaps/twos.txt'])
+    fitness, genome = optimizer.run(400)
+    print(f'Best fitness: {fitness}, exported to \"{optimizer.output_dir}\"')
@@ -0,0 +1,263 @@
+import csv
+import hashlib
+import os
+import pickle
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer, HeatmapSwitcher
+from Players.SimplePlayers import Player
+from Simulations.SimUtils import ANSI_COLORS, simulate_games_scores
+
+
+def make_heatmap_player(color: str, genome: np.ndarray, thresholds: list[int] = None) -> StaticHeatmapPlayer:
+    """
+    Build the player a genome describes
+    :param color: Player color
+    :param genome: Heatmaps of shape (heatmaps, x, y)
+    :param thresholds: HeatmapSwitcher thresholds, one per heatmap, None for a StaticHeatmapPlayer
+    :return: Player
+    """
+    if thresholds is None:
+        return StaticHeatmapPlayer(color, genome[0])
+    return HeatmapSwitcher(color, {threshold: genome[i] for i, threshold in enumerate(thresholds)})
+
+
+def evaluate_heatmap(genome: np.ndarray,
+                     thresholds: list[int] | None,
+                     color: str,
+                     opponents: list[Player],
+                     board_size: tuple[int, int],
+                     no_games: int,
+                     seed: int) -> float:
+    """
+    Fitness of a genome, the average points it scores against the opponents
+    :param genome: Heatmaps of shape (heatmaps, x, y)
+    :param thresholds: HeatmapSwitcher thresholds, None for a StaticHeatmapPlayer
+    :param color: Color of the evolved player
+    :param opponents: Fixed opponents
+    :param board_size: Size of the board
+    :param no_games: Number of games to play
+    :param seed: Seed for the games
+    :return: Average points
+    """
+    sim_params = {'board_size': board_size,
+                  'players': [make_heatmap_player(color, genome, thresholds)] + opponents,
+                  'starting_positions': None,
+                  'initial_pieces': None}
+    total_scores = simulate_games_scores(sim_params, no_games, seed)
+    return total_scores[color]['Points'] / max(no_games, 1)
+
+
+def export_txt_heatmap(heatmap: np.ndarray, filepath: str):
+    """
+    Write a heatmap in the format read by StaticHeatmapPlayer.load_txt_heatmap, values are clipped to single digits
+    :param heatmap: Heatmap array indexed [x][y]
+    :param filepath: File path to write to
+    """
+    lines = [''.join(str(value) for value in row) for row in np.clip(heatmap, 0, 9).tolist()]
+    with open(filepath, 'w') as write_file:
+        write_file.write('\n'.join(lines))
+
+
+def export_csv_heatmap(heatmap: np.ndarray, filepath: str):
+    """
+    Write a heatmap in the format read by StaticHeatmapPlayer.load_csv_heatmap
+    :param heatmap: Heatmap array indexed [x][y]
+    :param filepath: File path to write to
+    """
+    with open(filepath, 'w', newline='') as write_file:
+        csv.writer(write_file).writerows(heatmap.tolist())
+
+
+class HeatmapOptimizer:
+    """
+    Steady state genetic algorithm over heatmaps.
+    Every worker always has a candidate to evaluate, a new child is bred from the current population as soon as any
+    evaluation finishes, so there is no barrier between generations. A generation is counted every population_size
+    evaluations, at which point a checkpoint is written and the best genome is exported.
+    Fitness is cached by (genome hash, seed), so re-bred copies of a genome are never played again.
+    """
+    def __init__(self,
+                 opponents: list[Player],
+                 initial_heatmaps: list[str | list[str]],
+                 thresholds: list[int] = None,
+                 population_size: int = 16,
+                 games_per_evaluation: int = 20,
+                 seed: int = 0,
+                 mutation_rate: float = 0.05,
+                 mutation_scale: float = 2.0,
+                 board_size: tuple[int, int] = (20, 20),
+                 output_dir: str = 'Players/heatmaps/evolved',
+                 max_concurrent_workers: int = 8):
+        """
+        :param opponents: Fixed opponents every candidate plays against
+        :param initial_heatmaps: Starting genomes, a heatmap path each, or a list of paths (one per threshold)
+        :param thresholds: Evolve HeatmapSwitcher heatmaps with these thresholds, StaticHeatmapPlayer heatmaps if None
+        :param population_size: Number of genomes kept
+        :param games_per_evaluation: Games played to score a genome
+        :param seed: Seed for breeding, and for the evaluation games
+        :param mutation_rate: Chance of mutating each cell of a child
+        :param mutation_scale: Standard deviation of a cell mutation
+        :param board_size: Size of the board
+        :param output_dir: Directory for checkpoints and exported heatmaps
+        :param max_concurrent_workers: Maximum concurrent workers
+        """
+        self.opponents = opponents
+        self.thresholds = thresholds
+        self.population_size = population_size
+        self.games_per_evaluation = games_per_evaluation
+        self.seed = seed
+        self.mutation_rate = mutation_rate
+        self.mutation_scale = mutation_scale
+        self.board_size = board_size
+        self.output_dir = output_dir
+        self.max_concurrent_workers = max_concurrent_workers
+        used_colors = [player.color for player in opponents]
+        self.color = [color for color in ANSI_COLORS if color not in used_colors][0]
+        self.rng = np.random.default_rng(seed)
+        self.initial_genomes = [self.load_genome(heatmaps) for heatmaps in initial_heatmaps]
+        # [(fitness, genome)], unordered
+        self.population = []
+        # (genome hash, seed) => fitness
+        self.fitness_cache = {}
+        self.bred = 0
+        self.evaluations = 0
+        self.generation = 0
+
+    def load_genome(self, heatmaps: str | list[str]) -> np.ndarray:
+        """
+        Load a starting genome
+        :param heatmaps: Heatmap path, or a list of paths
+        :return: Genome of shape (heatmaps, x, y)
+        """
+        paths = [heatmaps] if isinstance(heatmaps, str) else heatmaps
+        return np.stack([StaticHeatmapPlayer.get_heatmap(path) for path in paths]).astype(np.int64)
+
+    @staticmethod
+    def genome_hash(genome: np.ndarray) -> str:
+        """
+        :param genome: Genome to hash
+        :return: Hex digest of the genome's shape and values
+        """
+        return hashlib.blake2b(repr(genome.shape).encode() + genome.tobytes(), digest_size=16).hexdigest()
+
+    def breed(self) -> np.ndarray:
+        """
+        Breed a child, the starting genomes come first, then mutants of them until two genomes are scored, then
+        children by tournament selection, uniform crossover and mutation
+        :return: Child genome
+        """
+        self.bred += 1
+        if self.bred <= len(self.initial_genomes):
+            return self.initial_genomes[self.bred - 1]
+        if len(self.population) < 2:
+            parent = self.initial_genomes[self.rng.integers(len(self.initial_genomes))]
+            return self.mutate(parent)
+        first, second = self.select_parent(), self.select_parent()
+        child = np.where(self.rng.random(first.shape) < 0.5, first, second)
+        return self.mutate(child)
+
+    def select_parent(self, tournament_size: int = 3) -> np.ndarray:
+        """
+        Tournament selection
+        :param tournament_size: Genomes in the tournament
+        :return: The fittest genome of the tournament
+        """
+        picks = self.rng.choice(len(self.population), min(tournament_size, len(self.population)), replace=False)
+        return max((self.population[i] for i in picks), key=lambda entry: entry[0])[1]
+
+    def mutate(self, genome: np.ndarray) -> np.ndarray:
+        """
+        Add rounded gaussian noise to a random subset of cells, keeping values within single digits
+        :param genome: Genome to mutate
+        :return: Mutated copy
+        """
+        noise = np.rint(self.rng.normal(0, self.mutation_scale, genome.shape)).astype(np.int64)
+        noise *= self.rng.random(genome.shape) < self.mutation_rate
+        return np.clip(genome + noise, 0, 9)
+
+    def add_result(self, genome: np.ndarray, fitness: float):
+        """
+        Add an evaluated genome, replacing the least fit genome once the population is full
+        :param genome: Evaluated genome
+        :param fitness: Its fitness
+        """
+        self.evaluations += 1
+        if len(self.population) < self.population_size:
+            self.population.append((fitness, genome))
+        else:
+            worst = min(range(len(self.population)), key=lambda i: self.population[i][0])
+            if fitness > self.population[worst][0]:
+                self.population[worst] = (fitness, genome)
+        if self.evaluations % self.population_size == 0:
+            self.generation += 1
+            self.save_checkpoint()
+            self.export_best(f'generation-{self.generation:04}')
+
+    def run(self, max_evaluations: int) -> tuple[float, np.ndarray]:
+        """
+        Evolve until max_evaluations genomes have been scored
+        Uses concurrent.futures.ProcessPoolExecutor, ensure to use if __name__ == '__main__'
+        :param max_evaluations: Number of evaluations to run, including cached ones
+        :return: (fitness, genome) of the best genome
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        pending = {}
+        submitted = self.evaluations
+        with ProcessPoolExecutor(max_workers=self.max_concurrent_workers) as executor:
+            while self.evaluations < max_evaluations:
+                while submitted < max_evaluations and len(pending) < self.max_concurrent_workers:
+                    genome = self.breed()
+                    key = (self.genome_hash(genome), self.seed)
+                    submitted += 1
+                    if key in self.fitness_cache:
+                        self.add_result(genome, self.fitness_cache[key])
+                        continue
+                    future = executor.submit(evaluate_heatmap, genome, self.thresholds, self.color, self.opponents,
+                                             self.board_size, self.games_per_evaluation, self.seed)
+                    pending[future] = (key, genome)
+                if not pending:
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, genome = pending.pop(future)
+                    self.fitness_cache[key] = future.result()
+                    self.add_result(genome, self.fitness_cache[key])
+        self.save_checkpoint()
+        self.export_best('best')
+        return self.get_best()
+
+    def get_best(self) -> tuple[float, np.ndarray]:
+        """
+        :return: (fitness, genome) of the fittest genome
+        """
+        return max(self.population, key=lambda entry: entry[0])
+
+    def export_best(self, name: str):
+        """
+        Export the best genome as .txt and .csv heatmaps, one file of each per threshold for a HeatmapSwitcher
+        :param name: Filename without extension
+        """
+        fitness, genome = self.get_best()
+        for i, heatmap in enumerate(genome):
+            suffix = f'-{self.thresholds[i]}' if self.thresholds is not None else ''
+            export_txt_heatmap(heatmap, os.path.join(self.output_dir, f'{name}{suffix}.txt'))
+            export_csv_heatmap(heatmap, os.path.join(self.output_dir, f'{name}{suffix}.csv'))
+
+    def save_checkpoint(self):
+        """
+        Write the optimizer state to output_dir/checkpoint.pkl
+        """
+        with open(os.path.join(self.output_dir, 'checkpoint.pkl'), 'wb') as write_file:
+            pickle.dump(self, write_file)
+
+    @staticmethod
+    def load_checkpoint(filepath: str) -> 'HeatmapOptimizer':
+        """
+        Load an optimizer to continue from a checkpoint
+        :param filepath: Checkpoint file path
+        :return: Optimizer
+        """
+        with open(filepath, 'rb') as read_file:
+            return pickle.load(read_file)
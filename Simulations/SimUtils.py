@@ -1,13 +1,25 @@
+import inspect
 import json
+import numpy as np
 
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from copy import deepcopy
+from dataclasses import dataclass, field
 from GameResources.Game import Tetros
+from GameResources.OpeningBook import OpeningBook
 from GameResources.ObjectFactory import ObjectFactory
+from GameResources.Structure import Piece
 from itertools import combinations
 from math import comb
-from os import remove
-from Players.SimplePlayers import Player
+from os import replace
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer, HeatmapSwitcher, AggressiveDynamic, DefensiveDynamic, \
+    DenseDynamic, LandGrabber
+from Players.SearchPlayers import ParanoidPlayer, MCTSPlayer
+from Players.SimplePlayers import Player, RandomPlayer, ExhaustiveRandomPlayer
+from Simulations.BatchEngine import BatchEngine
+from Simulations.TrainingData import ShardWriter, encode_game, get_piece_names, write_index, DEFAULT_SHARD_SIZE
+from timeit import default_timer as timer
+from typing import Callable
 from uuid import uuid4
 
 ANSI_COLORS = ['black',
@@ -38,6 +50,184 @@ PLAYER_SCORE_TEMPLATE = {
                 'Active Turns': 0
             }
 
+# Logging modes simulate_games can still provide when the games are played by BatchEngine
+BATCH_LOGGING_MODES = {'players', 'total_scores', 'average_scores'}
+
+# Simulation parameters of a worker process, set once by init_worker
+WORKER_SIM_PARAMS = {}
+# color => default piece set, FrozenPieces are shared between every player built in the process
+PIECE_SETS = {}
+# Player class => constructor parameters a PlayerSpec carries, read from the player's attributes of the same name
+SPEC_PARAMS = {
+    RandomPlayer: (),
+    ExhaustiveRandomPlayer: (),
+    StaticHeatmapPlayer: (),
+    HeatmapSwitcher: ('heatmaps',),
+    AggressiveDynamic: ('heatmaps',),
+    DefensiveDynamic: ('heatmaps',),
+    DenseDynamic: ('heatmaps',),
+    LandGrabber: ('heatmaps',),
+    ParanoidPlayer: ('time_limit', 'max_depth', 'max_branching', 'square_weight', 'mobility_weight', 'heatmap_weight',
+                     'verbose'),
+    MCTSPlayer: ('time_limit', 'max_playouts', 'exploration', 'verbose')
+}
+# Player class => attributes the constructor sets to defaults, copied onto the built player
+SPEC_ATTRIBUTES = {
+    AggressiveDynamic: ('placeable_weight', 'adjacent_weight')
+}
+
+
+@dataclass(frozen=True)
+class PlayerSpec:
+    """
+    Declarative description of a player.
+    Specs are cheap to pickle, workers build a fresh player from one for every game, with heatmaps from the
+    HeatmapRegistry and pieces from PIECE_SETS, instead of receiving and deep copying a full Player.
+    """
+    player_class: type
+    color: str
+    heatmap: str | None = None
+    params: dict = field(default_factory=dict)
+    attributes: dict = field(default_factory=dict)
+
+    def build(self) -> Player:
+        """
+        :return: New player with a full default hand
+        """
+        kwargs = dict(self.params)
+        if self.heatmap is not None:
+            kwargs['default_heatmap'] = self.heatmap
+        if 'initial_pieces' in inspect.signature(self.player_class).parameters:
+            if self.color not in PIECE_SETS:
+                PIECE_SETS[self.color] = ObjectFactory.generate_single_default_shape_set(self.color)
+            kwargs['initial_pieces'] = list(PIECE_SETS[self.color])
+        player = self.player_class(self.color, **kwargs)
+        for name, value in self.attributes.items():
+            setattr(player, name, value)
+        return player
+
+
+def make_player_spec(player: Player) -> PlayerSpec | Player:
+    """
+    Describe a fresh player as a PlayerSpec
+    Only players whose whole configuration is known are described, anything else (a played or custom hand, a heatmap
+    array, an opening book, classes missing from SPEC_PARAMS) is returned as is and deep copied for each game
+    :param player: Player to describe
+    :return: Spec, or the player itself
+    """
+    player_class = type(player)
+    if player_class not in SPEC_PARAMS or player.turn_count or player.opening_book is not None or \
+            [piece.name for piece in player.pieces] != [shape['name'] for shape in ObjectFactory.STANDARD_SHAPES.values()]:
+        return player
+    heatmap = player.heatmap_name if 'default_heatmap' in inspect.signature(player_class).parameters else None
+    if heatmap == 'array' or \
+            isinstance(player, HeatmapSwitcher) and not all(isinstance(path, str) for path in player.heatmaps.values()):
+        return player
+    params = {name: getattr(player, name) for name in SPEC_PARAMS[player_class]}
+    attributes = {name: getattr(player, name) for name in SPEC_ATTRIBUTES.get(player_class, ())}
+    return PlayerSpec(player_class, player.color, heatmap, deepcopy(params), deepcopy(attributes))
+
+
+def build_player(player: PlayerSpec | Player) -> Player:
+    """
+    Get a fresh player for a game
+    :param player: Spec to build, or player to copy
+    :return: Player
+    """
+    if isinstance(player, PlayerSpec):
+        return player.build()
+    return deepcopy(player)
+
+
+def init_worker(sim_params: dict):
+    """
+    Pool initializer, stores the simulation parameters in the worker so tasks only carry their game counts
+    :param sim_params: The simulation parameters, players should be PlayerSpecs
+    """
+    WORKER_SIM_PARAMS.clear()
+    WORKER_SIM_PARAMS.update(sim_params)
+
+
+def simulate_worker_games(no_games: int,
+                          player_indexes: tuple[int, ...] = None,
+                          task_key: tuple[int, ...] = (),
+                          first_game: int = 0) -> str:
+    """
+    Simulate games with the parameters given to init_worker
+    :param no_games: Number of games to play
+    :param player_indexes: Indexes of the players to seat, all players if None
+    :param task_key: Indexes identifying the task, see get_game_seed
+    :param first_game: Index of the task's first game
+    :return: aggregate logfile name, empty if no logfile
+    """
+    return simulate_games(get_worker_sim_params(player_indexes), no_games, task_key, first_game)
+
+
+def simulate_worker_scores(no_games: int,
+                           player_indexes: tuple[int, ...] = None,
+                           task_key: tuple[int, ...] = (),
+                           first_game: int = 0) -> dict[str, dict[str, float]]:
+    """
+    Simulate games with the parameters given to init_worker, returning the total scores instead of writing logs
+    :param no_games: Number of games to play
+    :param player_indexes: Indexes of the players to seat, all players if None
+    :param task_key: Indexes identifying the task, see get_game_seed
+    :param first_game: Index of the task's first game
+    :return: dict[player color, total scores]
+    """
+    return simulate_games_scores(get_worker_sim_params(player_indexes), no_games, None, task_key, first_game)
+
+
+def measure_player_cost(player_index: int, rounds: int = 3) -> float:
+    """
+    Estimate how long a player takes to play a game by timing its first few turns against ExhaustiveRandomPlayers
+    :param player_index: Index of the player in the parameters given to init_worker
+    :param rounds: Number of rounds to time
+    :return: Estimated seconds spent in the player's turns per game, one turn per piece
+    """
+    sim_params = WORKER_SIM_PARAMS
+    player = build_player(sim_params['players'][player_index])
+    turns_per_game = len(player.pieces)
+    opponents = [PlayerSpec(ExhaustiveRandomPlayer, opponent_color)
+                 for opponent_color in [c for c in ANSI_COLORS if c != player.color][:3]]
+    game = Tetros(sim_params['board_size'],
+                  sim_params['initial_pieces'],
+                  [player] + [build_player(opponent) for opponent in opponents],
+                  sim_params['starting_positions'],
+                  [],
+                  [])
+    game.play_game(max(rounds, 1))
+    return game.player_times[player.color] / max(rounds, 1) * turns_per_game
+
+
+def get_worker_sim_params(player_indexes: tuple[int, ...] = None) -> dict:
+    """
+    :param player_indexes: Indexes of the players to seat, all players if None
+    :return: The simulation parameters given to init_worker, with only the seated players
+    """
+    if player_indexes is None:
+        return WORKER_SIM_PARAMS
+    return dict(WORKER_SIM_PARAMS, players=[WORKER_SIM_PARAMS['players'][i] for i in player_indexes])
+
+
+def get_master_seed(sim_params: dict) -> int:
+    """
+    :param sim_params: The simulation parameters
+    :return: sim_params['seed'], or a new seed from OS entropy if there is none
+    """
+    seed = sim_params.get('seed')
+    return seed if seed is not None else int(np.random.SeedSequence().entropy)
+
+
+def get_game_seed(master_seed: int, *game_key: int) -> int:
+    """
+    Derive the seed of a single game, games get independent streams whichever process plays them
+    :param master_seed: Seed of the whole simulation
+    :param game_key: Indexes identifying the game, (task index, game index in task) for concurrent simulations
+    :return: 64-bit seed for Tetros
+    """
+    return int(np.random.SeedSequence(master_seed, spawn_key=game_key).generate_state(1, np.uint64)[0])
+
 
 def simulate_concurrent_games(sim_params: dict,
                               total_threads: int = 8,
@@ -45,6 +235,9 @@ def simulate_concurrent_games(sim_params: dict,
                               max_concurrent_workers: int = 8) -> list[str]:
     """
     Simulate games with the same parameters over multiple processes.
+    Game i of thread t is seeded with get_game_seed(sim_params['seed'], t, i), a seed is drawn if there is none, so
+    the results can be reproduced exactly from the seed in the logs. Set sim_params['batch_engine'] to play heatmap
+    and random player games with BatchEngine, see simulate_games.
     Uses concurrent.futures.ProcessPoolExecutor, ensure to use if __name__ == '__main__'
     :param sim_params: The simulation parameters
     :param total_threads: Total threads to run
@@ -52,38 +245,61 @@ def simulate_concurrent_games(sim_params: dict,
     :param max_concurrent_workers: Maximum concurrent workers
     :return:
     """
-    sim_params_list = [sim_params] * total_threads
+    sim_params = dict(sim_params, players=[make_player_spec(player) for player in sim_params['players']],
+                      seed=get_master_seed(sim_params))
     games_per_thread_list = [games_per_thread] * total_threads
+    task_keys = [(thread,) for thread in range(total_threads)]
     results = []
-    with ProcessPoolExecutor(max_workers=max_concurrent_workers) as executor:
-        results.extend(list(executor.map(simulate_games, sim_params_list, games_per_thread_list)))
+    with ProcessPoolExecutor(max_workers=max_concurrent_workers, initializer=init_worker,
+                             initargs=(sim_params,)) as executor:
+        results.extend(list(executor.map(simulate_worker_games, games_per_thread_list, [None] * total_threads,
+                                         task_keys)))
     return results
 
 
-def simulate_games(sim_params: dict, no_games: int) -> str:
+def simulate_games(sim_params: dict, no_games: int, task_key: tuple[int, ...] = (), first_game: int = 0) -> str:
     """
-    Simulate the given number of games on a single thread
-    :param sim_params: The simulation parameters
+    Simulate the given number of games on a single thread.
+    If sim_params['batch_engine'] is set, every player can be batched and only BATCH_LOGGING_MODES are requested, the
+    games are played by BatchEngine instead, see simulate_batch_scores.
+    :param sim_params: The simulation parameters, players may be PlayerSpecs, the aggregate log is written to
+    sim_params['log_dir'] if given, else Logs
     :param no_games: Number of games to play
+    :param task_key: Indexes identifying the task, game i is seeded with get_game_seed(seed, *task_key, first_game + i)
+    :param first_game: Index of the first game
     :return: aggregate logfile name, empty if no logfile
     """
     total_scores = {}
     total_times = []
     sim_id = uuid4()
+    master_seed = get_master_seed(sim_params)
     for player in sim_params['players']:
         total_scores[player.color] = deepcopy(PLAYER_SCORE_TEMPLATE)
     no_games = no_games if no_games >= 1 else 1
+    shard_writer = ShardWriter(sim_params.get('training_data_dir', 'TrainingData'), f'Shard-{sim_id}',
+                               sim_params.get('shard_size', DEFAULT_SHARD_SIZE)) \
+        if 'training_data' in sim_params['logging_modes'] else None
+    piece_names = []
     game = Tetros()
-    for i in range(no_games):
+    batch_players = get_batch_players(sim_params) \
+        if set(sim_params['logging_modes']) <= BATCH_LOGGING_MODES else None
+    if batch_players is not None:
+        total_scores = simulate_batch_scores(sim_params, batch_players, no_games,
+                                             get_game_seed(master_seed, *task_key, first_game))
+    for i in range(no_games if batch_players is None else 0):
         if 'game_complete' in sim_params['display_modes']:
             print('Playing Game ' + str(i))
         game = Tetros(sim_params['board_size'],
-                      deepcopy(sim_params['initial_pieces']),
-                      deepcopy(sim_params['players']),
+                      sim_params['initial_pieces'],
+                      [build_player(player) for player in sim_params['players']],
                       sim_params['starting_positions'],
                       sim_params['display_modes'],
-                      sim_params['logging_modes'])
+                      sim_params['logging_modes'],
+                      get_game_seed(master_seed, *task_key, first_game + i))
         game.play_game()
+        if shard_writer is not None:
+            piece_names = get_piece_names(game)
+            shard_writer.add_game(encode_game(game, piece_names))
         # Single Game Logging
         if sim_params['logging_modes']:
             log_obj = {}
@@ -108,6 +324,7 @@ def simulate_games(sim_params: dict, no_games: int) -> str:
                     total_times[j] += game_times[j]
             log_filename = f'Logs/Game-{game.uuid}.json'
             if log_obj != {}:
+                log_obj['seed'] = game.seed
                 with open(log_filename, 'w') as write_file:
                     write_file.write(json.dumps(log_obj, indent=4))
     if 'games_complete' in sim_params['display_modes']:
@@ -116,7 +333,7 @@ def simulate_games(sim_params: dict, no_games: int) -> str:
     if sim_params['logging_modes']:
         log_obj = {}
         if 'players' in sim_params['logging_modes']:
-            log_obj['players'] = [str(player) for player in game.players]
+            log_obj['players'] = [str(player) for player in (batch_players or game.players)]
         if 'total_scores' in sim_params['logging_modes']:
             log_obj['total_scores'] = total_scores
         if 'average_scores' in sim_params['logging_modes']:
@@ -128,8 +345,12 @@ def simulate_games(sim_params: dict, no_games: int) -> str:
             for total_time in total_times:
                 avg_times.append(total_time / no_games)
             log_obj['average_turn_times'] = make_loggable_turn_times(avg_times)
+        if shard_writer is not None:
+            shard_writer.flush()
+            log_obj['training_data'] = {'shards': shard_writer.shards, 'piece_names': piece_names}
         log_obj['no_games'] = no_games
-        log_filepath = f'Logs/Aggregate-{sim_id}.json'
+        log_obj['seed'] = {'master_seed': master_seed, 'task_key': list(task_key), 'first_game': first_game}
+        log_filepath = f"{sim_params.get('log_dir', 'Logs')}/Aggregate-{sim_id}.json"
         if log_obj != {}:
             with open(log_filepath, 'w') as write_file:
                 write_file.write(json.dumps(log_obj, indent=4))
@@ -137,39 +358,315 @@ def simulate_games(sim_params: dict, no_games: int) -> str:
     return ''
 
 
+def simulate_games_scores(sim_params: dict,
+                          no_games: int,
+                          seed: int = None,
+                          task_key: tuple[int, ...] = (),
+                          first_game: int = 0) -> dict[str, dict[str, float]]:
+    """
+    Simulate the given number of games on a single thread and return the total scores, without writing any logs
+    :param sim_params: The simulation parameters, players may be PlayerSpecs, logging modes are ignored. If
+    sim_params['batch_engine'] is set and every player can be batched, the games are played by simulate_batch_scores
+    :param no_games: Number of games to play
+    :param seed: Master seed, sim_params['seed'] if None, the same seed replays the same games
+    :param task_key: Indexes identifying the task, game i is seeded with get_game_seed(seed, *task_key, first_game + i)
+    :param first_game: Index of the first game
+    :return: dict[player color, total scores]
+    """
+    master_seed = seed if seed is not None else get_master_seed(sim_params)
+    batch_players = get_batch_players(sim_params)
+    if batch_players is not None:
+        return simulate_batch_scores(sim_params, batch_players, max(no_games, 1),
+                                     get_game_seed(master_seed, *task_key, first_game))
+    total_scores = {player.color: deepcopy(PLAYER_SCORE_TEMPLATE) for player in sim_params['players']}
+    for i in range(max(no_games, 1)):
+        game = Tetros(sim_params['board_size'],
+                      sim_params['initial_pieces'],
+                      [build_player(player) for player in sim_params['players']],
+                      sim_params['starting_positions'],
+                      [],
+                      [],
+                      get_game_seed(master_seed, *task_key, first_game + i))
+        game.play_game()
+        game_scores = game.calculate_player_scores()
+        for player in game.players:
+            for key in game_scores[player.color]:
+                total_scores[player.color][key] += game_scores[player.color][key]
+    return total_scores
+
+
+def get_batch_players(sim_params: dict) -> list[Player] | None:
+    """
+    :param sim_params: The simulation parameters, players may be PlayerSpecs
+    :return: The built players if sim_params['batch_engine'] is set and BatchEngine supports all of them, else None
+    """
+    if not sim_params.get('batch_engine'):
+        return None
+    players = [build_player(player) for player in sim_params['players']]
+    return players if all(BatchEngine.supports(player) for player in players) else None
+
+
+def simulate_batch_scores(sim_params: dict,
+                          players: list[Player],
+                          no_games: int,
+                          seed: int) -> dict[str, dict[str, float]]:
+    """
+    Play games in lockstep with BatchEngine, in batches of sim_params['batch_size'] games, default 256.
+    A batch draws every game from one stream, seeded with get_game_seed(seed, first game of the batch), so unlike
+    Tetros games the results depend on how the games are split into tasks.
+    :param sim_params: The simulation parameters
+    :param players: Players in every game, all supported by BatchEngine
+    :param no_games: Number of games to play
+    :param seed: Seed of the task
+    :return: dict[player color, total scores]
+    """
+    total_scores = {player.color: deepcopy(PLAYER_SCORE_TEMPLATE) for player in players}
+    batch_size = max(sim_params.get('batch_size', 256), 1)
+    for start in range(0, no_games, batch_size):
+        engine = BatchEngine(players,
+                             sim_params['board_size'],
+                             sim_params['starting_positions'],
+                             min(batch_size, no_games - start),
+                             get_game_seed(seed, start))
+        for game_scores in engine.play():
+            add_total_scores(total_scores, game_scores)
+    return total_scores
+
+
+def make_book_teacher(color: str, pieces: list[Piece]) -> Player:
+    """
+    Default opening book teacher, a fixed depth ParanoidPlayer so the book is deterministic
+    :param color: Color of the learning player
+    :param pieces: Its current hand
+    :return: Teacher
+    """
+    return ParanoidPlayer(color, time_limit=None, max_depth=2, initial_pieces=pieces)
+
+
+def build_opening_book(sim_params: dict,
+                       no_games: int,
+                       turns: int = 4,
+                       seed: int = None,
+                       teacher: Callable[[str, list[Piece]], Player] | None = make_book_teacher) -> OpeningBook:
+    """
+    Build an opening book for the first player in sim_params from the moves the teacher picks in its first turns
+    The teacher's moves are played, so the book follows the teacher's lines against the given opponents
+    Run on a single thread, every copy of the player shares the book being built
+    :param sim_params: The simulation parameters
+    :param no_games: Number of games to play
+    :param turns: Number of turns to record for the player
+    :param seed: Master seed for the games
+    :param teacher: Builds the search player for a (color, hand), None to record the player's own moves
+    :return: The book, save it with book.save
+    """
+    book = OpeningBook(turns)
+    book.learning = True
+    book.teacher = teacher
+    player = sim_params['players'][0]
+    player.opening_book = book
+    try:
+        simulate_games_scores(sim_params, no_games, seed)
+    finally:
+        player.opening_book = None
+        book.learning = False
+    return book
+
+
+def run_self_play(sim_params: dict,
+                  total_threads: int = 8,
+                  games_per_thread: int = 100,
+                  max_concurrent_workers: int = 8) -> str:
+    """
+    Simulate games over multiple processes and stream every move to compressed training shards.
+    Each worker writes its own shards, the shard lists are merged into an index file in sim_params['training_data_dir']
+    The workers' aggregate logs, which carry the shard lists and seeds, are written next to the shards instead of Logs
+    Uses concurrent.futures.ProcessPoolExecutor, ensure to use if __name__ == '__main__'
+    :param sim_params: The simulation parameters, 'training_data' is added to the logging modes
+    :param total_threads: Total threads to run
+    :param games_per_thread: How many games to play on each thread
+    :param max_concurrent_workers: Maximum concurrent workers
+    :return: Index file path
+    """
+    output_dir = sim_params.get('training_data_dir', 'TrainingData')
+    sim_params = dict(sim_params, logging_modes=list(sim_params['logging_modes']) + ['training_data'], log_dir=output_dir)
+    shards = []
+    piece_names = []
+    for log_file_path in simulate_concurrent_games(sim_params, total_threads, games_per_thread, max_concurrent_workers):
+        with open(log_file_path) as aggregate_log:
+            training_data = json.load(aggregate_log)['training_data']
+        shards.extend(training_data['shards'])
+        piece_names = training_data['piece_names'] or piece_names
+    index_path = write_index(output_dir, shards, piece_names, sim_params['board_size'])
+    print(f'Self play complete, {len(shards)} shards indexed at: \"{index_path}\"')
+    return index_path
+
+
 def run_league(players: list[Player],
                games_per_combination: int = 100,
                keep_intermediate_logs: bool = False,
                board_size: tuple[int, int] = (20, 20),
-               max_concurrent_workers: int = 8):
+               max_concurrent_workers: int = 8,
+               snapshot_interval: float | None = 60.0,
+               chunk_size: int = 10,
+               seed: int = None,
+               batch_engine: bool = False) -> str:
     """
     Run a tournament with every possible combination of the given players, and write the result to an aggregated log
     file.
+    Each combination's games are split into chunks of chunk_size games. Every player's cost per game is estimated
+    by timing its first few turns, then chunks are queued longest expected first, so slow combinations start early
+    and the cheap chunks left at the end keep every worker busy until the league finishes.
+    Scores are returned in memory and folded into the league table as each chunk finishes, the table is written
+    to the log file and the standings printed every snapshot_interval seconds, so a long league can be watched.
+    Game i of combination c is seeded with get_game_seed(seed, c, i), so results don't depend on the chunking.
+    With batch_engine, combinations BatchEngine supports play each chunk as one lockstep batch, raise chunk_size so
+    the batches are large enough to pay off, these results do depend on the chunking.
     Uses concurrent.futures.ProcessPoolExecutor, ensure to use if __name__ == '__main__'
     :param players: List of players, max 16.
     :param games_per_combination: Number of games each combination of players will play
-    :param keep_intermediate_logs: Keep logs for each individual combination?
+    :param keep_intermediate_logs: Write a log for each individual combination?
     :param  board_size: Size of the board. Default (20, 20)
     :param max_concurrent_workers: Maximum concurrent workers
-    :return:
+    :param snapshot_interval: Seconds between snapshots of the league table, None to only write the final table
+    :param chunk_size: Maximum games in one task
+    :param seed: Master seed, drawn from OS entropy and written to the log if None
+    :param batch_engine: Play combinations of heatmap and random players with BatchEngine?
+    :return: Log file path
     """
-    player_sets = [list(player_set_i) for player_set_i in combinations(players, 4)]
+    player_sets = list(combinations(range(len(players)), 4))
     print(f'Beginning tournaments, {len(player_sets)} tournaments to run...')
-    league_game_params = []
-    for player_set in player_sets:
-        league_game_params.append({'board_size': board_size,
-                             'players': player_set,
-                             'starting_positions': [[0, 0], [0, board_size[1] - 1], [board_size[0] - 1, 0],
-                                                    [board_size[0] - 1, board_size[1] - 1]],
-                             'initial_pieces': ObjectFactory.generate_shapes(),
-                             'display_modes': ['games_complete'],
-                             'logging_modes': ['players', 'total_scores', 'average_scores']})
-    games_per_thread_list = [games_per_combination] * len(league_game_params)
-    logfile_paths = []
-    with ProcessPoolExecutor(max_workers=max_concurrent_workers) as executor:
-        logfile_paths.extend(executor.map(simulate_games, league_game_params, games_per_thread_list))
-    agg_log_path = aggregate_league_scores(logfile_paths, players, games_per_combination, not keep_intermediate_logs)
+    league_params = {'board_size': board_size,
+                     'players': [make_player_spec(player) for player in players],
+                     'starting_positions': [[0, 0], [0, board_size[1] - 1], [board_size[0] - 1, 0],
+                                            [board_size[0] - 1, board_size[1] - 1]],
+                     'initial_pieces': ObjectFactory.generate_shapes(),
+                     'display_modes': [],
+                     'logging_modes': [],
+                     'seed': seed if seed is not None else get_master_seed({}),
+                     'batch_engine': batch_engine,
+                     'batch_size': max(chunk_size, 1)}
+    total_scores = {}
+    games_played = {player.color: 0 for player in players}
+    agg_log_path = f'Logs/Tournament-{uuid4()}.json'
+    games_per_combination = max(games_per_combination, 1)
+    chunk_size = max(chunk_size, 1)
+    with ProcessPoolExecutor(max_workers=max_concurrent_workers, initializer=init_worker,
+                             initargs=(league_params,)) as executor:
+        player_costs = list(executor.map(measure_player_cost, range(len(players))))
+        # (expected cost, combination index, player set, first game, games) for every chunk
+        chunks = []
+        for combination, player_set in enumerate(player_sets):
+            combination_cost = sum(player_costs[i] for i in player_set)
+            for start in range(0, games_per_combination, chunk_size):
+                games = min(chunk_size, games_per_combination - start)
+                chunks.append((combination_cost * games, combination, player_set, start, games))
+        chunks.sort(key=lambda chunk: chunk[0], reverse=True)
+        print(f'{len(chunks)} chunks queued, longest expected {chunks[0][0]:.1f}s, '
+              f'shortest {chunks[-1][0]:.1f}s')
+        futures = {executor.submit(simulate_worker_scores, games, player_set, (combination,), start):
+                   (player_set, games) for _, combination, player_set, start, games in chunks}
+        # player set => [total scores, games finished] of combinations with chunks still running
+        partial_scores = {}
+        last_snapshot = timer()
+        completed = 0
+        for future in as_completed(futures):
+            player_set, games = futures[future]
+            scores = future.result()
+            add_total_scores(total_scores, scores)
+            for i in player_set:
+                games_played[players[i].color] += games
+            partial = partial_scores.setdefault(player_set, [{}, 0])
+            add_total_scores(partial[0], scores)
+            partial[1] += games
+            if partial[1] < games_per_combination:
+                continue
+            del partial_scores[player_set]
+            completed += 1
+            if keep_intermediate_logs:
+                write_log(f'Logs/Aggregate-{uuid4()}.json',
+                          {'players': [str(players[i]) for i in player_set],
+                           'total_scores': partial[0],
+                           'average_scores': calculate_average_scores(partial[0], games_per_combination),
+                           'no_games': games_per_combination})
+            if snapshot_interval is not None and timer() - last_snapshot >= snapshot_interval and \
+                    completed < len(player_sets):
+                league_log = make_league_log(players, total_scores, games_played, games_per_combination, completed,
+                                             league_params['seed'])
+                write_log(agg_log_path, league_log)
+                print(f'{completed}/{len(player_sets)} tournaments complete, standings:')
+                print_standings(league_log)
+                last_snapshot = timer()
+    league_log = make_league_log(players, total_scores, games_played, games_per_combination, len(player_sets),
+                                 league_params['seed'])
+    write_log(agg_log_path, league_log)
+    print_standings(league_log)
     print(f'League complete, log file at: \"{agg_log_path}\"')
+    return agg_log_path
+
+
+def add_total_scores(total_scores: dict[str, dict[str, float]], scores: dict[str, dict[str, float]]):
+    """
+    Add scores to running totals, in place
+    :param total_scores: Running totals, by player color
+    :param scores: Scores to add, by player color
+    """
+    for player, player_scores in scores.items():
+        if player in total_scores:
+            for score_type in player_scores:
+                total_scores[player][score_type] += player_scores[score_type]
+        else:
+            total_scores[player] = dict(player_scores)
+
+
+def make_league_log(players: list[Player],
+                    total_scores: dict[str, dict[str, float]],
+                    games_played: dict[str, int],
+                    games_per_combination: int,
+                    combinations_complete: int,
+                    seed: int = None) -> dict:
+    """
+    Make the league table log, averages are over the games each player has played so far
+    :param players: Players in the league
+    :param total_scores: Running totals, by player color
+    :param games_played: Games played so far, by player color
+    :param games_per_combination: Games each combination plays
+    :param combinations_complete: Number of finished combinations
+    :param seed: Master seed of the league
+    :return: Loggable league table
+    """
+    average_scores = {}
+    for player in total_scores:
+        average_scores[player] = calculate_average_scores({player: total_scores[player]},
+                                                          max(games_played[player], 1))[player]
+    return {'players': make_logable_players(players),
+            'no_games_per_player': comb(len(players) - 1, 3) * games_per_combination,
+            'combinations_complete': f'{combinations_complete}/{comb(len(players), 4)}',
+            'games_played': games_played,
+            'total_scores': total_scores,
+            'average_scores': average_scores,
+            'seed': seed}
+
+
+def print_standings(league_log: dict):
+    """
+    Print players by average points
+    :param league_log: League table from make_league_log
+    """
+    standings = sorted(league_log['average_scores'].items(), key=lambda item: item[1]['Points'], reverse=True)
+    for rank, (player, scores) in enumerate(standings, 1):
+        print(f'{rank}. {player}: {scores["Points"]:.2f} points, {scores["Win"]:.1%} wins, '
+              f'{league_log["games_played"][player]} games')
+
+
+def write_log(log_filepath: str, log_obj: dict):
+    """
+    Write a JSON log, replacing the file atomically so a snapshot being read is never half written
+    :param log_filepath: File path to write to
+    :param log_obj: Log to write
+    """
+    with open(f'{log_filepath}.tmp', 'w') as write_file:
+        write_file.write(json.dumps(log_obj, indent=4))
+    replace(f'{log_filepath}.tmp', log_filepath)
 
 
 def make_logable_players(players: list[Player]) -> dict[str, str]:
@@ -213,36 +710,3 @@ def make_loggable_turn_times(turn_times: list[float]) -> dict[str, float]:
     turn_times_dict['total'] = total_time
     return turn_times_dict
 
-
-def aggregate_league_scores(log_files: list[str], players: list[Player], games_per_combination: int, destructive: bool = True) -> str:
-    """
-    Aggregate the scores from the given list of log files into one logfile.
-    :param log_files: List of logfiles to aggregate
-    :param players: list of players (to be written to log)
-    :param games_per_combination: games per combo
-    :param destructive: Destroy the aggregated log files?
-    """
-    aggregated_logs = {'players': make_logable_players(players),
-                       'no_games_per_player': int(comb(len(players), 4) * (4 / len(players))) * games_per_combination,
-                       'total_scores': {}}
-    for log_file_path in log_files:
-        with open(log_file_path) as aggregate_log:
-            data = json.load(aggregate_log)
-            for key in data:
-                if key == 'players':
-                    pass
-                elif key == 'total_scores':
-                    scores = data[key]
-                    for player in scores.keys():
-                        if player in aggregated_logs[key].keys():
-                            for score_type in scores[player]:
-                                aggregated_logs[key][player][score_type] += scores[player][score_type]
-                        else:
-                            aggregated_logs[key][player] = scores[player]
-        if destructive:
-            remove(log_file_path)
-    aggregated_logs['average_scores'] = calculate_average_scores(aggregated_logs['total_scores'], aggregated_logs['no_games_per_player'])
-    aggregated_logfile_name = f'Logs/Tournament-{uuid4()}.json'
-    with open(aggregated_logfile_name, 'w') as write_file:
-        write_file.write(json.dumps(aggregated_logs, indent=4))
-    return aggregated_logfile_name
@@ -0,0 +1,141 @@
+import json
+import os
+import numpy as np
+
+from GameResources.BitBoard import BitBoard
+from GameResources.Game import Tetros
+
+# Moves per shard, a buffered move holds about 3.6KB of uncompressed planes on a 20x20 board, so about 15MB per writer
+DEFAULT_SHARD_SIZE = 4096
+
+
+def encode_game(game: Tetros, piece_names: list[str]) -> dict[str, np.ndarray]:
+    """
+    Encode every move of a finished game as a training record.
+    The board is replayed from board.move_history, each state is seen from the player about to move, with players
+    ordered from the mover onwards in turn order.
+    :param game: A finished game
+    :param piece_names: Piece names, in the column order of the piece masks
+    :return: Arrays with one row per move:
+        planes (moves, players * 2, x, y) occupancy then corner plane for each player
+        pieces (moves, players, pieces) True where the piece is still in the player's hand
+        move_piece (moves,) column of the placed piece
+        move_cells (moves, x, y) cells covered by the move
+        points (moves, players) final points for each player
+        wins (moves, players) final win flag for each player
+    """
+    board = game.board
+    colors = board.player_colors
+    history = board.move_history
+    width, height = board.get_size()
+    player_count = len(colors)
+    columns = {name: column for column, name in enumerate(piece_names)}
+    scores = game.calculate_player_scores()
+    planes = np.zeros((len(history), player_count * 2, width, height), dtype=bool)
+    pieces = np.zeros((len(history), player_count, len(piece_names)), dtype=bool)
+    move_piece = np.zeros(len(history), dtype=np.int16)
+    move_cells = np.zeros((len(history), width, height), dtype=bool)
+    points = np.zeros((len(history), player_count), dtype=np.float32)
+    wins = np.zeros((len(history), player_count), dtype=np.int8)
+    replay = BitBoard((width, height), colors)
+    for color in colors:
+        replay.starts[color] = board.bitboard.starts[color]
+    replay.update_masks()
+    hands = {color: {piece.name for piece in board.initial_hands[color]} for color in colors}
+    for i, (color, name, mask) in enumerate(history):
+        start = colors.index(color)
+        for j in range(player_count):
+            other = colors[(start + j) % player_count]
+            planes[i, 2 * j] = replay.to_array(replay.owned[other])
+            planes[i, 2 * j + 1] = replay.to_array(replay.corners[other])
+            for piece_name in hands[other]:
+                if piece_name in columns:
+                    pieces[i, j, columns[piece_name]] = True
+            points[i, j] = scores[other]['Points']
+            wins[i, j] = scores[other]['Win']
+        move_piece[i] = columns.get(name, -1)
+        move_cells[i] = replay.to_array(mask)
+        replay.place(mask, color)
+        hands[color].discard(name)
+    return {'planes': planes, 'pieces': pieces, 'move_piece': move_piece, 'move_cells': move_cells,
+            'points': points, 'wins': wins}
+
+
+class ShardWriter:
+    """
+    Buffer encoded games and write them to compressed .npz shards of at most shard_size moves.
+    At most one shard of records is held in memory.
+    """
+    def __init__(self, output_dir: str, prefix: str, shard_size: int = DEFAULT_SHARD_SIZE):
+        """
+        :param output_dir: Directory to write shards to
+        :param prefix: Shard filename prefix, must be unique to the writer
+        :param shard_size: Maximum moves per shard
+        """
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.buffer = []
+        self.buffered_moves = 0
+        self.buffered_games = 0
+        # {'path', 'moves', 'games'} for each shard written
+        self.shards = []
+        os.makedirs(output_dir, exist_ok=True)
+
+    def add_game(self, record: dict[str, np.ndarray]):
+        """
+        Add an encoded game, writing a shard once shard_size moves are buffered
+        :param record: Output of encode_game
+        """
+        self.buffer.append(record)
+        self.buffered_moves += len(record['move_piece'])
+        self.buffered_games += 1
+        if self.buffered_moves >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered games to a shard
+        """
+        if not self.buffer:
+            return
+        path = os.path.join(self.output_dir, f'{self.prefix}-{len(self.shards):05}.npz')
+        arrays = {key: np.concatenate([record[key] for record in self.buffer]) for key in self.buffer[0]}
+        arrays['game_index'] = np.concatenate([np.full(len(record['move_piece']), i, dtype=np.int32)
+                                               for i, record in enumerate(self.buffer)])
+        np.savez_compressed(path, **arrays)
+        self.shards.append({'path': path, 'moves': self.buffered_moves, 'games': self.buffered_games})
+        self.buffer = []
+        self.buffered_moves = 0
+        self.buffered_games = 0
+
+
+def get_piece_names(game: Tetros) -> list[str]:
+    """
+    Piece names of a game in the column order of the piece masks, the starting hand order of the first player
+    :param game: Game to get the names for
+    :return: Piece names
+    """
+    return [piece.name for piece in game.board.initial_hands[game.board.player_colors[0]]]
+
+
+def write_index(output_dir: str, shards: list[dict], piece_names: list[str], board_size: tuple[int, int]) -> str:
+    """
+    Merge shard lists from every worker into an index file
+    :param output_dir: Directory the shards were written to
+    :param shards: Shards written by every worker
+    :param piece_names: Piece names, in the column order of the piece masks
+    :param board_size: Size of the board
+    :return: Index file path
+    """
+    index = {
+        'board_size': list(board_size),
+        'piece_names': piece_names,
+        'moves': sum(shard['moves'] for shard in shards),
+        'games': sum(shard['games'] for shard in shards),
+        'shards': [dict(shard, path=os.path.relpath(shard['path'], output_dir)) for shard in shards]
+    }
+    index_path = os.path.join(output_dir, 'index.json')
+    with open(index_path, 'w') as write_file:
+        write_file.write(json.dumps(index, indent=4))
+    return index_path
@@ -0,0 +1,12 @@
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def run_from_root(monkeypatch):
+    """
+    Heatmap and log paths are relative to the repository root
+    """
+    monkeypatch.chdir(ROOT)
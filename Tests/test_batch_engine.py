@@ -0,0 +1,44 @@
+from GameResources.ObjectFactory import ObjectFactory
+from GameResources.OpeningBook import OpeningBook
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer, AggressiveDynamic
+from Players.SearchPlayers import ParanoidPlayer
+from Players.SimplePlayers import ExhaustiveRandomPlayer, RandomPlayer
+from Simulations.BatchEngine import BatchEngine
+from Simulations.SimUtils import simulate_games_scores
+
+COLORS = ['blue', 'green', 'red', 'yellow']
+
+
+def make_sim_params(players, batch_engine):
+    return {'board_size': (20, 20), 'players': players, 'starting_positions': None, 'initial_pieces': None,
+            'batch_engine': batch_engine}
+
+
+def test_supports_only_implemented_classes():
+    assert BatchEngine.supports(StaticHeatmapPlayer('blue', 'Players/heatmaps/sidewinder.txt'))
+    assert BatchEngine.supports(ExhaustiveRandomPlayer('blue', ObjectFactory.generate_single_default_shape_set('blue')))
+    assert not BatchEngine.supports(ParanoidPlayer('blue', time_limit=None, max_depth=1))
+    assert not BatchEngine.supports(AggressiveDynamic('blue'))
+    assert not BatchEngine.supports(RandomPlayer('blue', ObjectFactory.generate_single_default_shape_set('blue')))
+    booked = StaticHeatmapPlayer('blue', 'Players/heatmaps/sidewinder.txt')
+    booked.opening_book = OpeningBook()
+    assert not BatchEngine.supports(booked)
+
+
+def test_unsupported_player_falls_back_to_tetros():
+    def make_players():
+        return [ParanoidPlayer('blue', time_limit=None, max_depth=1)] + \
+            [ExhaustiveRandomPlayer(color, ObjectFactory.generate_single_default_shape_set(color)) for color in COLORS[1:]]
+    batched = simulate_games_scores(make_sim_params(make_players(), True), 1, seed=3)
+    sequential = simulate_games_scores(make_sim_params(make_players(), False), 1, seed=3)
+    assert batched == sequential
+
+
+def test_batch_scores_shape():
+    players = [StaticHeatmapPlayer(color, 'Players/heatmaps/sidewinder.txt') for color in COLORS[:2]] + \
+        [ExhaustiveRandomPlayer(color, ObjectFactory.generate_single_default_shape_set(color)) for color in COLORS[2:]]
+    results = BatchEngine(players, no_games=8, seed=0).play()
+    assert len(results) == 8
+    for scores in results:
+        assert set(scores) == set(COLORS)
+        assert sum(player_scores['Win'] for player_scores in scores.values()) >= 1
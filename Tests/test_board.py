@@ -0,0 +1,173 @@
+import random
+import numpy as np
+
+from GameResources.MoveGenerator import MoveGenerator
+from GameResources.ObjectFactory import ObjectFactory
+from GameResources.Structure import GameBoard
+from Players.SimplePlayers import ExhaustiveRandomPlayer, PackedMove
+
+COLORS = ['blue', 'green', 'red', 'yellow']
+ADJACENT = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def make_board(seed: int) -> tuple[GameBoard, list[ExhaustiveRandomPlayer]]:
+    players = [ExhaustiveRandomPlayer(color, ObjectFactory.generate_single_default_shape_set(color)) for color in COLORS]
+    return GameBoard((20, 20), players, None, random.Random(seed)), players
+
+
+def iter_random_positions(seed: int, max_moves: int = 200):
+    """
+    Play random legal placements with place_piece, players pass when they can't move
+    :return: Generator of the board, once before the first move and after every move
+    """
+    rng = random.Random(seed)
+    board, _ = make_board(seed)
+    yield board
+    passes = 0
+    while passes < len(COLORS) and len(board.move_history) < max_moves:
+        color = board.to_move
+        hand = board.get_hand(color)
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, color, hand)
+        if not len(xs):
+            passes += 1
+            board.set_player_to_move(COLORS[(COLORS.index(color) + 1) % len(COLORS)])
+            continue
+        passes = 0
+        i = rng.randrange(len(xs))
+        assert board.place_piece(int(xs[i]), int(ys[i]), hand[piece_ids[i]], int(orientation_ids[i]))
+        yield board
+
+
+def brute_force_masks(board: GameBoard, color: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scan every cell of the board for the forbidden and corner masks of a player
+    :return: (forbidden, corners) indexed [x][y]
+    """
+    width, height = board.get_size()
+
+    def cell_color(x, y):
+        return board.positions[x][y].color if 0 <= x < width and 0 <= y < height else None
+
+    start = tuple(board.starting_positions[board.player_colors.index(color)])
+    forbidden = np.zeros((width, height), dtype=bool)
+    corners = np.zeros((width, height), dtype=bool)
+    for x in range(width):
+        for y in range(height):
+            forbidden[x, y] = cell_color(x, y) is not None or \
+                any(cell_color(x + dx, y + dy) == color for dx, dy in ADJACENT)
+            corners[x, y] = not forbidden[x, y] and \
+                ((x, y) == start or any(cell_color(x + dx, y + dy) == color for dx, dy in DIAGONAL))
+    return forbidden, corners
+
+
+def test_incremental_masks_match_brute_force():
+    for seed in range(2):
+        for board in iter_random_positions(seed):
+            bitboard = board.bitboard
+            for color in COLORS:
+                forbidden, corners = brute_force_masks(board, color)
+                assert (bitboard.to_array(bitboard.forbidden[color]) == forbidden).all()
+                assert (bitboard.to_array(bitboard.corners[color]) == corners).all()
+                assert board.corner_index[color] == {(int(x), int(y)) for x, y in zip(*np.nonzero(corners))}
+                for x, y in np.ndindex(*corners.shape):
+                    assert (color in board.positions[x][y].placeable_by) == corners[x, y]
+
+
+def brute_force_moves(board: GameBoard, color: str, pieces: list) -> set[tuple[int, int, int, int]]:
+    """
+    Try every orientation of every piece at every offset against the brute force masks
+    :return: (piece_id, orientation_id, x, y) of every legal placement
+    """
+    forbidden, corners = brute_force_masks(board, color)
+    width, height = forbidden.shape
+    moves = set()
+    for piece_id, piece in enumerate(pieces):
+        for orientation_id, orientation in enumerate(ObjectFactory.get_orientations(piece.currentCoords)):
+            for x in range(width):
+                for y in range(height):
+                    cells = [(x + dx, y + dy) for dx, dy in orientation.coords]
+                    if all(0 <= cx < width and 0 <= cy < height for cx, cy in cells) and \
+                            not any(forbidden[cell] for cell in cells) and any(corners[cell] for cell in cells):
+                        moves.add((piece_id, orientation_id, x, y))
+    return moves
+
+
+def test_generate_moves_matches_brute_force():
+    for seed in range(2):
+        for board in iter_random_positions(seed):
+            if len(board.move_history) % 12:
+                continue
+            for color in COLORS:
+                hand = board.get_hand(color)
+                generated = MoveGenerator.generate_moves(board, color, hand)
+                moves = set(zip(*(values.tolist() for values in generated)))
+                assert len(moves) == len(generated[0])
+                assert moves == brute_force_moves(board, color, hand)
+
+
+def snapshot(board: GameBoard, players: list[ExhaustiveRandomPlayer]) -> tuple:
+    """
+    :return: Everything apply_move changes, on the board and in the hands
+    """
+    bitboard = board.bitboard
+    return (tuple(tuple((square.color, tuple(square.placeable_by)) for square in column) for column in board.positions),
+            bitboard.occupied, dict(bitboard.owned), dict(bitboard.forbidden), dict(bitboard.corners),
+            {color: frozenset(cells) for color, cells in board.corner_index.items()},
+            {color: tuple(piece.name for piece in board.get_hand(color)) for color in COLORS},
+            {player.color: (tuple(piece.name for piece in player.pieces), player.final_piece) for player in players},
+            tuple(board.move_history), board.to_move, board.zobrist_hash)
+
+
+def iter_applied_moves(seed: int, max_moves: int):
+    """
+    Make random legal moves with Player.apply_move until a player can't move
+    :return: Generator of (board, players, snapshot before the move), after every move
+    """
+    rng = random.Random(seed)
+    board, players = make_board(seed)
+    while len(board.move_history) < max_moves:
+        player = players[COLORS.index(board.to_move)]
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, player.color, player.pieces)
+        if not len(xs):
+            return
+        before = snapshot(board, players)
+        i = rng.randrange(len(xs))
+        assert player.apply_move(board, PackedMove(int(piece_ids[i]), int(orientation_ids[i]), (int(xs[i]), int(ys[i]))))
+        yield board, players, before
+
+
+def test_apply_and_undo_round_trip():
+    for seed in range(3):
+        history = []
+        for board, players, before in iter_applied_moves(seed, 40):
+            history.append((players[COLORS.index(board.move_history[-1][0])], before))
+        assert len(history) >= 20
+        while history:
+            player, before = history.pop()
+            player.undo_move(board)
+            assert snapshot(board, players) == before
+
+
+def recompute_hash(board: GameBoard) -> int:
+    """
+    :return: Zobrist hash of the position built from scratch
+    """
+    key = GameBoard.zobrist_key('turn', board.to_move)
+    for x, column in enumerate(board.positions):
+        for y, square in enumerate(column):
+            if square.color is not None:
+                key ^= GameBoard.zobrist_key('cell', x, y, square.color)
+    for color in COLORS:
+        for piece in board.get_hand(color):
+            key ^= GameBoard.zobrist_key('piece', color, piece.name)
+    return key
+
+
+def test_zobrist_hash_matches_position():
+    hashes = {}
+    for seed in range(3):
+        for board, players, _ in iter_applied_moves(seed, 40):
+            assert board.state_hash() == recompute_hash(board)
+            position = snapshot(board, players)[0]
+            assert hashes.setdefault(board.state_hash(), position) == position
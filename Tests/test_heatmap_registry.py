@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer
+from Players.HeatmapRegistry import HeatmapRegistry
+from Simulations.HeatmapOptimizer import export_txt_heatmap
+
+
+def test_cached_heatmap_is_shared_and_read_only():
+    first = StaticHeatmapPlayer.get_heatmap('Players/heatmaps/sidewinder.txt')
+    assert StaticHeatmapPlayer.get_heatmap('Players/heatmaps/sidewinder.txt') is first
+    with pytest.raises(ValueError):
+        first[0][0] = 1
+
+
+def test_rewritten_heatmap_is_reloaded(tmp_path):
+    filepath = str(tmp_path / 'heatmap.txt')
+    export_txt_heatmap(np.zeros((20, 20), dtype=np.int64), filepath)
+    assert not StaticHeatmapPlayer.get_heatmap(filepath).any()
+    export_txt_heatmap(np.full((20, 20), 3, dtype=np.int64), filepath)
+    assert (StaticHeatmapPlayer.get_heatmap(filepath) == 3).all()
+    HeatmapRegistry.clear()
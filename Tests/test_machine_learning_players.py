@@ -0,0 +1,39 @@
+import numpy as np
+
+from GameResources.Game import Tetros
+from GameResources.MoveGenerator import MoveGenerator
+from GameResources.ObjectFactory import ObjectFactory
+from Players.MachineLearningPlayers import MachineLearningPlayer, BoardState
+from Players.SimplePlayers import ExhaustiveRandomPlayer, PackedMove
+
+
+class OccupancyPlayer(MachineLearningPlayer):
+    """
+    Scores a state by the squares the player to move occupies
+    """
+    def mutate_state(self):
+        return None
+
+    def score_states(self, states: BoardState) -> np.ndarray:
+        return states.planes[:, 0].sum(axis=(1, 2))
+
+
+def test_encode_moves_matches_applied_moves():
+    for rounds in [0, 3, 8]:
+        player = OccupancyPlayer('blue', ObjectFactory.generate_single_default_shape_set('blue'), None)
+        opponents = [ExhaustiveRandomPlayer(color, ObjectFactory.generate_single_default_shape_set(color))
+                     for color in ['green', 'red', 'yellow']]
+        game = Tetros((20, 20), None, [player] + opponents, None, [], [], rounds)
+        game.play_game(rounds)
+        board = game.board
+        board.set_player_to_move(player.color)
+        piece_ids, orientation_ids, xs, ys = MoveGenerator.generate_moves(board, player.color, player.pieces)
+        assert len(xs)
+        states = player.encode_moves(board, piece_ids, orientation_ids, xs, ys)
+        for i in range(0, len(xs), max(len(xs) // 25, 1)):
+            move = PackedMove(int(piece_ids[i]), int(orientation_ids[i]), (int(xs[i]), int(ys[i])))
+            assert player.apply_move(board, move)
+            expected = player.combine_state_board(board)
+            player.undo_move(board)
+            assert (states.planes[i] == expected.planes).all()
+            assert (states.pieces[i] == expected.pieces).all()
@@ -0,0 +1,43 @@
+import pickle
+import pytest
+
+from GameResources.ObjectFactory import ObjectFactory
+from GameResources.OpeningBook import OpeningBook
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer
+from Players.SimplePlayers import ExhaustiveRandomPlayer
+from Simulations.SimUtils import build_opening_book, simulate_games_scores
+
+
+def make_sim_params() -> dict:
+    players = [StaticHeatmapPlayer('blue', 'Players/heatmaps/sidewinder.txt')] + \
+        [ExhaustiveRandomPlayer(color, ObjectFactory.generate_single_default_shape_set(color))
+         for color in ['green', 'red', 'yellow']]
+    return {'board_size': (20, 20), 'players': players, 'starting_positions': None, 'initial_pieces': None}
+
+
+def test_book_save_load_lookup_round_trip(tmp_path):
+    sim_params = make_sim_params()
+    book = build_opening_book(sim_params, 6, turns=3, seed=11, teacher=None)
+    assert 0 < book.size <= len(book.table) // 2
+    filepath = str(tmp_path / 'book.npy')
+    book.save(filepath)
+    loaded = OpeningBook.load(filepath, turns=3)
+    assert loaded.size == book.size
+    assert (loaded.table == book.table).all()
+    with pytest.raises(ValueError):
+        loaded.add(None, None)
+    assert pickle.loads(pickle.dumps(loaded)).path == filepath
+    # Replaying the same games with the loaded book finds every turn the book covers
+    found = []
+    lookup = loaded.lookup
+
+    def recording_lookup(board):
+        found.append(lookup(board))
+        return found[-1]
+
+    loaded.lookup = recording_lookup
+    sim_params['players'][0].opening_book = loaded
+    simulate_games_scores(sim_params, 6, seed=11)
+    assert len(found) == 6 * 3
+    assert all(move is not None for move in found)
+
@@ -0,0 +1,21 @@
+import pytest
+
+from GameResources.Game import Tetros
+from GameResources.ObjectFactory import ObjectFactory
+from Players.SearchPlayers import MCTSPlayer
+from Players.SimplePlayers import ExhaustiveRandomPlayer
+
+
+def test_mcts_needs_a_budget():
+    with pytest.raises(ValueError):
+        MCTSPlayer('blue', time_limit=None, max_playouts=None)
+
+
+def test_mcts_playout_budget():
+    player = MCTSPlayer('blue', time_limit=None, max_playouts=20)
+    opponents = [ExhaustiveRandomPlayer(color, ObjectFactory.generate_single_default_shape_set(color))
+                 for color in ['green', 'red', 'yellow']]
+    game = Tetros((20, 20), None, [player] + opponents, None, [], [], 1)
+    game.play_game(2)
+    assert player.turn_count == 2
+    assert player.last_search[0] == 20
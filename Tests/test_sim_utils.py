@@ -0,0 +1,65 @@
+import json
+import os
+import pickle
+
+from conftest import ROOT
+
+from GameResources.ObjectFactory import ObjectFactory
+from Players.AlgorithmicPlayers import StaticHeatmapPlayer, HeatmapSwitcher, AggressiveDynamic, LandGrabber
+from Players.SearchPlayers import ParanoidPlayer, MCTSPlayer
+from Players.SimplePlayers import ExhaustiveRandomPlayer, RandomPlayer
+from Simulations.SimUtils import PlayerSpec, make_player_spec, build_player, run_league
+
+
+def test_player_specs_rebuild_the_player():
+    aggressive = AggressiveDynamic('red', {10: 'Players/heatmaps/bullseye.txt', 21: 'Players/heatmaps/twos.txt'})
+    aggressive.placeable_weight = 7
+    players = [RandomPlayer('blue', ObjectFactory.generate_single_default_shape_set('blue')),
+               ExhaustiveRandomPlayer('blue', ObjectFactory.generate_single_default_shape_set('blue')),
+               StaticHeatmapPlayer('green', 'Players/heatmaps/bullseye.txt'),
+               HeatmapSwitcher('green'),
+               LandGrabber('green'),
+               aggressive,
+               ParanoidPlayer('yellow', 'Players/heatmaps/twos.txt', time_limit=None, max_depth=3, max_branching=None,
+                              mobility_weight=0.5),
+               MCTSPlayer('yellow', time_limit=None, max_playouts=50, exploration=0.7)]
+    for player in players:
+        spec = make_player_spec(player)
+        assert isinstance(spec, PlayerSpec)
+        built = build_player(pickle.loads(pickle.dumps(spec)))
+        assert type(built) is type(player)
+        assert str(built) == str(player)
+        for name in ['heatmaps', 'time_limit', 'max_depth', 'max_branching', 'mobility_weight', 'max_playouts',
+                     'exploration', 'placeable_weight', 'adjacent_weight']:
+            assert getattr(built, name, None) == getattr(player, name, None)
+
+
+def test_unknown_players_are_copied():
+    played = StaticHeatmapPlayer('green', 'Players/heatmaps/bullseye.txt')
+    played.turn_count = 1
+    assert make_player_spec(played) is played
+    array_player = StaticHeatmapPlayer('green', StaticHeatmapPlayer.get_heatmap('Players/heatmaps/bullseye.txt'))
+    assert make_player_spec(array_player) is array_player
+
+
+def run_seeded_league(chunk_size: int, seed: int) -> dict:
+    heatmaps = ['sidewinder', 'bullseye', 'aggressiveX']
+    players = [StaticHeatmapPlayer(color, os.path.join(ROOT, 'Players', 'heatmaps', f'{heatmap}.txt'))
+               for color, heatmap in zip(['blue', 'green', 'red'], heatmaps)] + \
+        [ExhaustiveRandomPlayer(color, ObjectFactory.generate_single_default_shape_set(color))
+         for color in ['yellow', 'magenta']]
+    log_filepath = run_league(players, games_per_combination=4, max_concurrent_workers=2, snapshot_interval=None,
+                              chunk_size=chunk_size, seed=seed)
+    with open(log_filepath) as league_log:
+        return json.load(league_log)
+
+
+def test_same_seed_gives_same_league(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir('Logs')
+    first = run_seeded_league(2, 7)
+    for other in [run_seeded_league(2, 7), run_seeded_league(3, 7)]:
+        assert other['seed'] == first['seed'] == 7
+        assert other['games_played'] == first['games_played']
+        assert other['total_scores'] == first['total_scores']
+    assert run_seeded_league(2, 8)['total_scores'] != first['total_scores']
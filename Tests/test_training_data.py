@@ -0,0 +1,33 @@
+import numpy as np
+
+from GameResources.Game import Tetros
+from GameResources.ObjectFactory import ObjectFactory
+from Players.SimplePlayers import ExhaustiveRandomPlayer
+from Simulations.TrainingData import ShardWriter, encode_game, get_piece_names
+
+COLORS = ['blue', 'green', 'red', 'yellow']
+
+
+def play_random_game(seed: int) -> Tetros:
+    players = [ExhaustiveRandomPlayer(color, ObjectFactory.generate_single_default_shape_set(color)) for color in COLORS]
+    game = Tetros((20, 20), None, players, None, [], [], seed)
+    game.play_game()
+    return game
+
+
+def test_shard_writer_splits_games_into_shards(tmp_path):
+    writer = ShardWriter(str(tmp_path), 'Shard', shard_size=50)
+    moves = 0
+    for seed in range(3):
+        game = play_random_game(seed)
+        record = encode_game(game, get_piece_names(game))
+        assert len(record['move_piece']) == len(game.board.move_history)
+        moves += len(record['move_piece'])
+        writer.add_game(record)
+    writer.flush()
+    assert len(writer.shards) >= 2
+    assert sum(shard['moves'] for shard in writer.shards) == moves
+    assert sum(shard['games'] for shard in writer.shards) == 3
+    for shard in writer.shards:
+        with np.load(shard['path']) as arrays:
+            assert len(arrays['planes']) == shard['moves']